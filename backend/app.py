@@ -1,15 +1,35 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from search import stream_search_with_history
-from fastapi.responses import StreamingResponse, JSONResponse
+from search import stream_search_with_history, gemini_breaker, background_tasks
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from geo import get_country_from_request
-from db import Database
+from async_db import AsyncDatabase
 from dotenv import load_dotenv
+import asyncio
 import logging
+import orjson
 from datetime import datetime
 from blogger import stream_blog_generation
+from brave import close_client, brave_limiter, brave_breaker
+from search_cache import brave_cache
+from singleflight import inflight
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the database pool up front so the first request doesn't pay for it
+    await database.pool.open()
+    yield
+    # Let in-flight chat saves finish before their connections go away
+    if background_tasks:
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Release pooled Brave and database connections on shutdown
+    await close_client()
+    brave_cache.close()
+    await database.close()
+
+# orjson serializes responses, including datetimes, much faster than the stdlib encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure logging
 logging.basicConfig(
@@ -30,8 +50,8 @@ app.add_middleware(
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize the database
-database = Database()
+# Shares the asyncpg pool with async_db.db used by the blog generator
+database = AsyncDatabase()
 
 @app.post("/create-session")
 async def create_session(request: Request):
@@ -39,8 +59,8 @@ async def create_session(request: Request):
         body = await request.json()
         chat_title = body.get("chat_title")
         query = body.get("query")
-        session = database.create_chat_session("anonymous", chat_title, query)
-        return JSONResponse({
+        session = await database.create_chat_session("anonymous", chat_title, query)
+        return ORJSONResponse({
             "status": "success",
             "chat_id": session['chat_id'],
             "chat_title": session['chat_title'],
@@ -48,7 +68,7 @@ async def create_session(request: Request):
         })
     except Exception as e:
         logging.error(f"Error creating chat session: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to create chat session"}
         )
@@ -60,12 +80,12 @@ async def create_pending_chat(request: Request):
         chat_id = body.get("chat_id")
         query = body.get("query")
         if not chat_id or not query:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"error": "chat_id and query are required"}
             )
-        pending_chat = database.create_pending_chat(chat_id, query)
-        return JSONResponse({
+        pending_chat = await database.create_pending_chat(chat_id, query)
+        return ORJSONResponse({
             "status": "success",
             "chat_id": pending_chat['chat_id'],
             "query": pending_chat['query'],
@@ -73,7 +93,7 @@ async def create_pending_chat(request: Request):
         })
     except Exception as e:
         logging.error(f"Error creating pending chat: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to create pending chat"}
         )
@@ -82,18 +102,14 @@ async def create_pending_chat(request: Request):
 async def list_chats():
     try:
         user_id = "anonymous"
-        chats = database.get_user_chats(user_id)
-        # Convert datetime objects to strings
-        for chat in chats:
-            chat['created_at'] = chat['created_at'].isoformat()
-            chat['updated_at'] = chat['updated_at'].isoformat()
-        return JSONResponse({
+        chats = await database.get_user_chats(user_id)
+        return ORJSONResponse({
             "status": "success",
             "chats": chats
         })
     except Exception as e:
         logging.error(f"Error listing chats for user {user_id}: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to list chats"}
         )
@@ -101,25 +117,43 @@ async def list_chats():
 @app.get("/chat-details/{chat_id}")
 async def get_chat_details(chat_id: str):
     try:
-        chat_details = database.get_chat_details(chat_id)
-        pending_query = database.get_pending_chat(chat_id)
-        if not chat_details and not pending_query:
-            return JSONResponse(
+        # Postgres returns the nested details as JSON text, which goes into the
+        # response as is instead of being decoded and re-encoded here
+        chat_details = await database.get_chat_details_json(chat_id)
+        pending_query = await database.get_pending_chat(chat_id)
+        if chat_details == "[]" and not pending_query:
+            return ORJSONResponse(
                 status_code=404,
                 content={"error": "Chat not found"}
             )
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "success",
-            "chat_details": chat_details,
+            "chat_details": orjson.Fragment(chat_details),
             "pending_query": pending_query
         })
     except Exception as e:
         logging.error(f"Error fetching chat details for chat_id {chat_id}: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to fetch chat details"}
         )
 
+@app.get("/message-search-results/{message_id}")
+async def get_message_search_results(message_id: str):
+    try:
+        search_results = await database.get_message_search_results(message_id)
+        return ORJSONResponse({
+            "status": "success",
+            "message_id": message_id,
+            "search_results": search_results
+        })
+    except Exception as e:
+        logging.error(f"Error fetching search results for message_id {message_id}: {str(e)}")
+        return ORJSONResponse(
+            status_code=500,
+            content={"error": "Failed to fetch search results"}
+        )
+
 @app.post("/create-pending-blog")
 async def create_pending_blog(request: Request):
     try:
@@ -128,15 +162,15 @@ async def create_pending_blog(request: Request):
         user_id = body.get("user_id", "anonymous")
         
         if not blog_topic:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"error": "blog_topic is required"}
             )
             
         # Create a new blog session
-        blog_session = database.create_blog_session(user_id, blog_topic)
+        blog_session = await database.create_blog_session(user_id, blog_topic)
         
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "success",
             "blog_id": blog_session['blog_id'],
             "blog_topic": blog_session['blog_topic'],
@@ -144,7 +178,7 @@ async def create_pending_blog(request: Request):
         })
     except Exception as e:
         logging.error(f"Error creating pending blog: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": f"Failed to create pending blog: {str(e)}"}
         )
@@ -152,18 +186,14 @@ async def create_pending_blog(request: Request):
 @app.get("/list-blogs")
 async def list_blogs(user_id: str = "anonymous"):
     try:
-        blogs = database.get_user_blogs(user_id)
-        # Convert datetime objects to strings
-        for blog in blogs:
-            blog['created_at'] = blog['created_at'].isoformat()
-            blog['updated_at'] = blog['updated_at'].isoformat()
-        return JSONResponse({
+        blogs = await database.get_user_blogs(user_id)
+        return ORJSONResponse({
             "status": "success",
             "blogs": blogs
         })
     except Exception as e:
         logging.error(f"Error listing blogs for user {user_id}: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to list blogs"}
         )
@@ -171,31 +201,19 @@ async def list_blogs(user_id: str = "anonymous"):
 @app.get("/blog-details/{blog_id}")
 async def get_blog_details(blog_id: str):
     try:
-        blog_details = database.get_blog_details(blog_id)
+        blog_details = await database.get_blog_details_json(blog_id)
         if not blog_details:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=404,
                 content={"error": "Blog not found"}
             )
-        
-        # Convert datetime objects to strings
-        if blog_details.get('created_at'):
-            blog_details['created_at'] = blog_details['created_at'].isoformat()
-        if blog_details.get('updated_at'):
-            blog_details['updated_at'] = blog_details['updated_at'].isoformat()
-            
-        # Convert datetime objects in search terms
-        for term in blog_details.get('search_terms', []):
-            if term.get('created_at'):
-                term['created_at'] = term['created_at'].isoformat()
-                
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "success",
-            "blog_details": blog_details
+            "blog_details": orjson.Fragment(blog_details)
         })
     except Exception as e:
         logging.error(f"Error fetching blog details for blog_id {blog_id}: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": f"Failed to fetch blog details: {str(e)}"}
         )
@@ -232,6 +250,19 @@ async def stream_blog_generation_endpoint(
         media_type="text/event-stream"
     )
 
+@app.get("/metrics")
+async def metrics():
+    return ORJSONResponse({
+        "brave_cache": brave_cache.stats(),
+        "brave_limiter": brave_limiter.stats(),
+        "single_flight": inflight.stats(),
+        "db_pool": database.pool.stats(),
+        "circuit_breakers": {
+            "brave": brave_breaker.stats(),
+            "gemini": gemini_breaker.stats()
+        }
+    })
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,685 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Connections shared by every AsyncDatabase instance in the process
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+# Seconds a caller waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Ping connections that sat idle at least this many seconds before reusing them
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '30'))
+# Prepared statements kept per connection; asyncpg prepares every query on first use
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def result_from_row(row: dict) -> dict:
+    """Nest one joined search_results x result_meta_urls x result_thumbnails row"""
+    return {
+        'title': row['title'],
+        'url': row['url'],
+        'description': row['description'],
+        'page_age': row['page_age'],
+        'language': row['language'],
+        'family_friendly': row['family_friendly'],
+        'type': row['type'],
+        'subtype': row['subtype'],
+        'is_live': row['is_live'],
+        'meta_url': {
+            'scheme': row['scheme'],
+            'netloc': row['netloc'],
+            'hostname': row['hostname'],
+            'favicon': row['favicon'],
+            'path': row['path']
+        },
+        'thumbnail': {
+            'src': row['thumbnail_src'],
+            'original': row['thumbnail_original'],
+            'is_logo': row['thumbnail_is_logo']
+        }
+    }
+
+
+def search_result_rows(chat_id: str, message_id: str, results: List[Dict[str, Any]]) -> dict:
+    """Split search results into row tuples for each table, in column order.
+
+    result_ids are generated here so the child rows can reference their parent
+    without waiting for the parent insert to return it. Each result also gets
+    its list index as position, since rows inserted together share created_at.
+    """
+    rows = {'result_ids': [], 'results': [], 'profiles': [], 'meta_urls': [], 'thumbnails': []}
+    for position, result in enumerate(results):
+        result_id = str(uuid.uuid4())
+        rows['result_ids'].append(result_id)
+        rows['results'].append((
+            result_id, chat_id, message_id, result.get('title'), result.get('url'),
+            result.get('is_source_local', False), result.get('is_source_both', False),
+            result.get('description'), result.get('page_age'),
+            result.get('language'), result.get('family_friendly', True),
+            result.get('type'), result.get('subtype'),
+            result.get('is_live', False), position
+        ))
+        if profile := result.get('profile'):
+            rows['profiles'].append((result_id, profile.get('name'), profile.get('url'),
+                                     profile.get('long_name'), profile.get('img')))
+        if meta_url := result.get('meta_url'):
+            rows['meta_urls'].append((result_id, meta_url.get('scheme'), meta_url.get('netloc'),
+                                      meta_url.get('hostname'), meta_url.get('favicon'),
+                                      meta_url.get('path')))
+        if thumbnail := result.get('thumbnail'):
+            rows['thumbnails'].append((result_id, thumbnail.get('src'), thumbnail.get('original'),
+                                       thumbnail.get('logo', False)))
+    return rows
+
+
+def blog_search_result_rows(blog_id: str, results: List[Dict[str, Any]], term_id: str = None) -> List[tuple]:
+    """Row tuples for blog_search_results, with result_ids generated up front and list positions"""
+    return [(
+        str(uuid.uuid4()),
+        blog_id,
+        term_id if term_id is not None else result['term_id'],
+        result['title'],
+        result['url'],
+        result.get('description'),
+        result.get('page_age'),
+        result.get('summary', ''),
+        position
+    ) for position, result in enumerate(results)]
+
+
+async def init_connection(conn):
+    # Rows keep the shapes the API has always returned: UUIDs as str, jsonb as Python objects
+    await conn.set_type_codec('uuid', encoder=str, decoder=str, schema='pg_catalog', format='text')
+    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+def columns(rows: List[tuple]) -> List[list]:
+    """Transpose row tuples into one list per column, for INSERT ... SELECT FROM unnest(...)"""
+    return [list(column) for column in zip(*rows)]
+
+
+class PooledConnection(asyncpg.Connection):
+    """asyncpg connection that remembers when it was last given back to the pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.released_at = time.monotonic()
+
+    def mark_released(self):
+        self.released_at = time.monotonic()
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.released_at
+
+
+class AsyncConnectionPool:
+    """asyncpg pool with a checkout timeout, health checks and usage metrics for /metrics.
+
+    The asyncpg pool is created on first use, inside the running event loop.
+    A connection idle for longer than health_check_after is pinged before it
+    is handed out and replaced if the ping fails, so a database restart doesn't
+    cost one failed request per stale connection. asyncpg itself resets the
+    connections given back.
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float,
+                 health_check_after: float, window: int = 1000):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.pool = None
+        self.lock = asyncio.Lock()
+        self.closed = False
+        self.checkouts = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.wait_times = deque(maxlen=window)
+
+    async def open(self) -> asyncpg.Pool:
+        async with self.lock:
+            if self.pool is None:
+                self.pool = await asyncpg.create_pool(
+                    database=os.getenv('DB_NAME', 'postgres'),
+                    user=os.getenv('DB_USER', 'postgres'),
+                    password=os.getenv('DB_PASSWORD', 'postgres'),
+                    host=os.getenv('DB_HOST', 'localhost'),
+                    port=int(os.getenv('DB_PORT', '5432')),
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                    init=init_connection,
+                    connection_class=PooledConnection,
+                )
+            return self.pool
+
+    async def healthy(self, conn) -> bool:
+        if conn.is_closed():
+            return False
+        if conn.idle_for() < self.health_check_after:
+            return True
+        try:
+            await conn.fetchval("SELECT 1", timeout=self.timeout)
+            return True
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError):
+            return False
+
+    @asynccontextmanager
+    async def connection(self):
+        """Hold one pooled connection for the duration of the block"""
+        if self.closed:
+            raise PoolTimeout("Connection pool is closed")
+        pool = self.pool or await self.open()
+        started = time.monotonic()
+        while True:
+            try:
+                conn = await pool.acquire(timeout=max(started + self.timeout - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise PoolTimeout(f"No database connection free after {self.timeout}s")
+            if await self.healthy(conn):
+                break
+            # The pool opens a fresh connection in this slot on the next acquire
+            logger.warning("Replacing a dead database connection")
+            self.reconnects += 1
+            conn.terminate()
+            await pool.release(conn)
+        self.checkouts += 1
+        self.wait_times.append(time.monotonic() - started)
+        try:
+            yield conn
+        finally:
+            conn.mark_released()
+            await pool.release(conn)
+
+    async def close(self):
+        self.closed = True
+        if self.pool is not None:
+            await self.pool.close()
+
+    def stats(self) -> dict:
+        size = self.pool.get_size() if self.pool else 0
+        idle = self.pool.get_idle_size() if self.pool else 0
+        waits = sorted(self.wait_times)
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "max_size": self.max_size,
+            "utilization": round((size - idle) / self.max_size, 3) if self.max_size else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "reconnects": self.reconnects,
+            "wait_avg_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_ms": 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "wait_max_ms": 1000 * waits[-1] if waits else 0.0,
+        }
+
+
+_pool = None
+
+
+def get_pool() -> AsyncConnectionPool:
+    """Return the process-wide asyncpg pool, creating it on first use"""
+    global _pool
+    if _pool is None or _pool.closed:
+        _pool = AsyncConnectionPool(
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
+        )
+    return _pool
+
+
+class AsyncDatabase:
+    """Database API on asyncpg, for use on the event loop.
+
+    Rows come back as plain dicts with UUIDs as strings.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool = None):
+        self.pool = pool or get_pool()
+
+    async def fetch(self, query: str, *args) -> List[dict]:
+        async with self.pool.connection() as conn:
+            return [dict(row) for row in await conn.fetch(query, *args)]
+
+    async def fetchrow(self, query: str, *args) -> Optional[dict]:
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(query, *args)
+            return dict(row) if row else None
+
+    async def execute(self, query: str, *args) -> None:
+        async with self.pool.connection() as conn:
+            await conn.execute(query, *args)
+
+    async def create_chat_session(self, user_id: str, chat_title: str, query: str) -> dict:
+        """Create a new chat session with a title and add the query to pending chats"""
+        session = await self.fetchrow("""
+            INSERT INTO chat_sessions (user_id, chat_title)
+            VALUES ($1, $2)
+            RETURNING chat_id, user_id, chat_title, created_at, updated_at
+        """, user_id, chat_title)
+        await self.create_pending_chat(session['chat_id'], chat_title)
+        return session
+
+    async def create_chat_message(self, chat_id: str, user_id: str, user_query: str, ai_response: str) -> dict:
+        """Create a new chat message with both user query and AI response"""
+        return await self.fetchrow("""
+            INSERT INTO chat_messages (chat_id, user_id, user_query, ai_response)
+            VALUES ($1, $2, $3, $4)
+            RETURNING message_id, chat_id, created_at
+        """, chat_id, user_id, user_query, ai_response)
+
+    async def store_search_results(self, chat_id: str, message_id: str, results: List[Dict[str, Any]]) -> List[str]:
+        """Store search results and their related data in one transaction, one insert per table"""
+        rows = search_result_rows(chat_id, message_id, results)
+        if not rows['result_ids']:
+            return []
+        async with self.pool.connection() as conn, conn.transaction():
+            await conn.execute("""
+                INSERT INTO search_results (
+                    result_id, chat_id, message_id, title, url, is_source_local,
+                    is_source_both, description, page_age, language,
+                    family_friendly, type, subtype, is_live, position
+                )
+                SELECT * FROM unnest(
+                    $1::uuid[], $2::uuid[], $3::uuid[], $4::text[], $5::text[], $6::boolean[],
+                    $7::boolean[], $8::text[], $9::text[], $10::text[],
+                    $11::boolean[], $12::text[], $13::text[], $14::boolean[], $15::int[]
+                )
+            """, *columns(rows['results']))
+            if rows['profiles']:
+                await conn.execute("""
+                    INSERT INTO result_profiles (result_id, name, url, long_name, img)
+                    SELECT * FROM unnest($1::uuid[], $2::text[], $3::text[], $4::text[], $5::text[])
+                """, *columns(rows['profiles']))
+            if rows['meta_urls']:
+                await conn.execute("""
+                    INSERT INTO result_meta_urls (
+                        result_id, scheme, netloc, hostname, favicon, path
+                    )
+                    SELECT * FROM unnest($1::uuid[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[])
+                """, *columns(rows['meta_urls']))
+            if rows['thumbnails']:
+                await conn.execute("""
+                    INSERT INTO result_thumbnails (
+                        result_id, src, original, is_logo
+                    )
+                    SELECT * FROM unnest($1::uuid[], $2::text[], $3::text[], $4::boolean[])
+                """, *columns(rows['thumbnails']))
+        return rows['result_ids']
+
+    async def get_user_chats(self, user_id: str) -> List[dict]:
+        """Get all chat sessions for a user"""
+        return await self.fetch("""
+            SELECT chat_id, created_at, updated_at, chat_title
+            FROM chat_sessions
+            WHERE user_id = $1
+            ORDER BY updated_at DESC
+        """, user_id)
+
+    async def get_chat_details_json(self, chat_id: str) -> str:
+        """Get all details for a chat session as a JSON array, nested by Postgres"""
+        async with self.pool.connection() as conn:
+            return await conn.fetchval("""
+                SELECT COALESCE(json_agg(json_build_object(
+                    'message_id', cm.message_id,
+                    'user_query', cm.user_query,
+                    'summary', cm.ai_response,
+                    'created_at', cm.created_at,
+                    'search_results', COALESCE(results.search_results, '[]'::json)
+                ) ORDER BY cm.created_at ASC), '[]'::json)::text AS chat_details
+                FROM chat_messages cm
+                LEFT JOIN LATERAL (
+                    SELECT json_agg(json_build_object(
+                        'title', sr.title,
+                        'url', sr.url,
+                        'description', sr.description,
+                        'page_age', sr.page_age,
+                        'language', sr.language,
+                        'family_friendly', sr.family_friendly,
+                        'type', sr.type,
+                        'subtype', sr.subtype,
+                        'is_live', sr.is_live,
+                        'meta_url', json_build_object(
+                            'scheme', rmu.scheme,
+                            'netloc', rmu.netloc,
+                            'hostname', rmu.hostname,
+                            'favicon', rmu.favicon,
+                            'path', rmu.path
+                        ),
+                        'thumbnail', json_build_object(
+                            'src', rt.src,
+                            'original', rt.original,
+                            'is_logo', rt.is_logo
+                        )
+                    ) ORDER BY sr.created_at ASC, sr.position ASC) AS search_results
+                    FROM search_results sr
+                    LEFT JOIN result_meta_urls rmu ON sr.result_id = rmu.result_id
+                    LEFT JOIN result_thumbnails rt ON sr.result_id = rt.result_id
+                    WHERE sr.message_id = cm.message_id
+                ) results ON true
+                WHERE cm.chat_id = $1
+            """, chat_id)
+
+    async def get_chat_details(self, chat_id: str) -> List[dict]:
+        """Get all details for a chat session, one entry per message with its search results"""
+        try:
+            return json.loads(await self.get_chat_details_json(chat_id))
+        except Exception as e:
+            logger.error(f"Error fetching chat details for chat_id {chat_id}: {e}")
+            return []
+
+    async def get_chat_turns(self, chat_id: str) -> List[dict]:
+        """Get just the queries and summaries of a chat, oldest first, for building prompts"""
+        return await self.fetch("""
+            SELECT message_id, user_query, ai_response AS summary, created_at
+            FROM chat_messages
+            WHERE chat_id = $1
+            ORDER BY created_at ASC
+        """, chat_id)
+
+    async def get_message_search_results(self, message_id: str) -> List[dict]:
+        """Get the search results stored for a single chat message"""
+        rows = await self.fetch("""
+            SELECT
+                sr.title, sr.url, sr.description, sr.page_age, sr.language,
+                sr.family_friendly, sr.type, sr.subtype, sr.is_live,
+                rmu.scheme, rmu.netloc, rmu.hostname, rmu.favicon, rmu.path,
+                rt.src AS thumbnail_src, rt.original AS thumbnail_original, rt.is_logo AS thumbnail_is_logo
+            FROM search_results sr
+            LEFT JOIN result_meta_urls rmu ON sr.result_id = rmu.result_id
+            LEFT JOIN result_thumbnails rt ON sr.result_id = rt.result_id
+            WHERE sr.message_id = $1
+            ORDER BY sr.created_at ASC, sr.position ASC
+        """, message_id)
+        return [result_from_row(row) for row in rows]
+
+    async def create_pending_chat(self, chat_id: str, query: str) -> dict:
+        """Create a new pending chat or update if it already exists"""
+        return await self.fetchrow("""
+            INSERT INTO pending_chats (chat_id, query)
+            VALUES ($1, $2)
+            ON CONFLICT (chat_id) DO UPDATE
+            SET query = EXCLUDED.query
+            RETURNING chat_id, query, created_at
+        """, chat_id, query)
+
+    async def update_pending_chat(self, chat_id: str, query: str) -> dict:
+        """Update an existing pending chat"""
+        return await self.fetchrow("""
+            UPDATE pending_chats
+            SET query = $1
+            WHERE chat_id = $2
+            RETURNING chat_id, query, created_at
+        """, query, chat_id)
+
+    async def delete_pending_chat(self, chat_id: str, query: str = None) -> None:
+        """Delete a pending chat, or only if it still holds `query` when one is given"""
+        if query is not None:
+            # A follow-up may have replaced the pending query since it was answered
+            await self.execute("""
+                DELETE FROM pending_chats
+                WHERE chat_id = $1 AND query = $2
+            """, chat_id, query)
+            return
+        await self.execute("""
+            DELETE FROM pending_chats
+            WHERE chat_id = $1
+        """, chat_id)
+
+    async def get_pending_chat(self, chat_id: str) -> Optional[dict]:
+        """Get the pending query for a chat session"""
+        return await self.fetchrow("""
+            SELECT query
+            FROM pending_chats
+            WHERE chat_id = $1
+        """, chat_id)
+
+    async def get_history_digest(self, chat_id: str) -> Optional[dict]:
+        """Get the stored digest of a chat's older turns"""
+        return await self.fetchrow("""
+            SELECT digest, turns_covered
+            FROM chat_history_digests
+            WHERE chat_id = $1
+        """, chat_id)
+
+    async def save_history_digest(self, chat_id: str, digest: str, turns_covered: int) -> None:
+        """Create or replace the digest of a chat's older turns"""
+        await self.execute("""
+            INSERT INTO chat_history_digests (chat_id, digest, turns_covered)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (chat_id) DO UPDATE
+            SET digest = EXCLUDED.digest,
+                turns_covered = EXCLUDED.turns_covered,
+                updated_at = CURRENT_TIMESTAMP
+        """, chat_id, digest, turns_covered)
+
+    async def create_blog_session(self, user_id: str, blog_topic: str) -> dict:
+        """Create a new blog session and return its details"""
+        session = await self.fetchrow("""
+            INSERT INTO blog_sessions (user_id, blog_topic)
+            VALUES ($1, $2)
+            RETURNING blog_id, user_id, blog_topic, status, created_at
+        """, user_id, blog_topic)
+        await self.create_pending_blog(session['blog_id'], blog_topic)
+        return session
+
+    async def update_blog_status(self, blog_id: str, status: str, blog_content: str = None) -> dict:
+        """Update blog session status and content"""
+        if blog_content:
+            return await self.fetchrow("""
+                UPDATE blog_sessions
+                SET status = $1, blog_content = $2
+                WHERE blog_id = $3
+                RETURNING blog_id, status, blog_content, updated_at
+            """, status, blog_content, blog_id)
+        return await self.fetchrow("""
+            UPDATE blog_sessions
+            SET status = $1
+            WHERE blog_id = $2
+            RETURNING blog_id, status, updated_at
+        """, status, blog_id)
+
+    async def add_blog_search_terms(self, blog_id: str, search_terms: List[str]) -> List[dict]:
+        """Add multiple search terms for a blog session"""
+        return await self.fetch("""
+            INSERT INTO blog_search_terms (blog_id, search_term)
+            SELECT $1::uuid, unnest($2::text[])
+            RETURNING term_id, search_term, created_at
+        """, blog_id, search_terms)
+
+    async def store_blog_search_results(self, blog_id: str, results: List[Dict[str, Any]], term_id: str = None) -> List[str]:
+        """Store search results for blog search terms
+
+        If term_id is None, assumes each result in results contains its own term_id
+        Otherwise, assigns the same term_id to all results
+        """
+        values = blog_search_result_rows(blog_id, results, term_id)
+        if not values:
+            return []
+        await self.execute("""
+            INSERT INTO blog_search_results
+            (result_id, blog_id, term_id, title, url, description, page_age, summary, position)
+            SELECT * FROM unnest(
+                $1::uuid[], $2::uuid[], $3::uuid[], $4::text[], $5::text[], $6::text[], $7::text[], $8::text[],
+                $9::int[]
+            )
+        """, *columns(values))
+        return [row[0] for row in values]
+
+    async def update_generation_state(self, blog_id: str, stage: str, iteration: int = 0,
+                                      is_completed: bool = False, event_type: str = None,
+                                      event_data: dict = None) -> dict:
+        """Update or create blog generation state"""
+        return await self.fetchrow("""
+            INSERT INTO blog_generation_state
+            (blog_id, current_stage, iteration, is_completed, last_event_type, last_event_data)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (blog_id) DO UPDATE
+            SET current_stage = EXCLUDED.current_stage,
+                iteration = EXCLUDED.iteration,
+                is_completed = EXCLUDED.is_completed,
+                last_event_type = EXCLUDED.last_event_type,
+                last_event_data = EXCLUDED.last_event_data,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING state_id, current_stage, iteration, is_completed, updated_at
+        """, blog_id, stage, iteration, is_completed, event_type, event_data or None)
+
+    async def get_blog_details_json(self, blog_id: str) -> Optional[str]:
+        """Get a blog with its generation state, search terms and results as a JSON object, built by Postgres"""
+        async with self.pool.connection() as conn:
+            return await conn.fetchval("""
+                SELECT json_build_object(
+                    'blog_id', bs.blog_id,
+                    'blog_topic', bs.blog_topic,
+                    'status', bs.status,
+                    'blog_content', bs.blog_content,
+                    'created_at', bs.created_at,
+                    'updated_at', bs.updated_at,
+                    'generation_state', json_build_object(
+                        'current_stage', bgs.current_stage,
+                        'iteration', bgs.iteration,
+                        'is_completed', bgs.is_completed,
+                        'last_event_type', bgs.last_event_type,
+                        'last_event_data', bgs.last_event_data
+                    ),
+                    'search_terms', COALESCE((
+                        SELECT json_agg(json_build_object(
+                            'term_id', bst.term_id,
+                            'search_term', bst.search_term,
+                            'created_at', bst.created_at
+                        ) ORDER BY bst.created_at ASC)
+                        FROM blog_search_terms bst
+                        WHERE bst.blog_id = bs.blog_id
+                    ), '[]'::json),
+                    'search_results', COALESCE((
+                        SELECT json_agg(json_build_object(
+                            'result_id', bsr.result_id,
+                            'term_id', bsr.term_id,
+                            'title', bsr.title,
+                            'url', bsr.url,
+                            'description', bsr.description,
+                            'summary', bsr.summary
+                        ) ORDER BY bst.created_at ASC, bsr.created_at ASC, bsr.position ASC)
+                        FROM blog_search_terms bst
+                        JOIN blog_search_results bsr ON bst.term_id = bsr.term_id
+                        WHERE bst.blog_id = bs.blog_id
+                    ), '[]'::json)
+                )::text AS blog_details
+                FROM blog_sessions bs
+                LEFT JOIN blog_generation_state bgs ON bs.blog_id = bgs.blog_id
+                WHERE bs.blog_id = $1
+            """, blog_id)
+
+    async def get_blog_details(self, blog_id: str) -> dict:
+        """Get comprehensive blog details including search terms and results
+
+        Timestamps come back as ISO 8601 strings.
+        """
+        blog = await self.get_blog_details_json(blog_id)
+        return json.loads(blog) if blog else None
+
+    async def create_pending_blog(self, blog_id: str, topic: str) -> dict:
+        """Create a new pending blog or update if it already exists"""
+        return await self.fetchrow("""
+            INSERT INTO pending_blogs (blog_id, topic)
+            VALUES ($1, $2)
+            ON CONFLICT (blog_id) DO UPDATE
+            SET topic = EXCLUDED.topic
+            RETURNING blog_id, topic, current_stage, created_at
+        """, blog_id, topic)
+
+    async def delete_pending_blog(self, blog_id: str) -> None:
+        """Delete a pending blog"""
+        await self.execute("""
+            DELETE FROM pending_blogs
+            WHERE blog_id = $1
+        """, blog_id)
+
+    async def get_user_blogs(self, user_id: str) -> List[dict]:
+        """Get all blog sessions for a user"""
+        return await self.fetch("""
+            SELECT blog_id, blog_topic, status, created_at, updated_at
+            FROM blog_sessions
+            WHERE user_id = $1
+            ORDER BY updated_at DESC
+        """, user_id)
+
+    async def get_pending_blog_by_id(self, blog_id: str) -> Optional[dict]:
+        """Get pending blog by blog_id
+
+        Returns the blog session with additional pending info if it exists
+        """
+        return await self.fetchrow("""
+            SELECT bs.blog_id, bs.user_id, bs.blog_topic, bs.status, bs.blog_content,
+                   bs.created_at, bs.updated_at, pb.current_stage
+            FROM blog_sessions bs
+            JOIN pending_blogs pb ON bs.blog_id = pb.blog_id
+            WHERE bs.blog_id = $1
+        """, blog_id)
+
+    async def get_pending_blog(self, user_id: str, topic: str = None) -> Optional[dict]:
+        """DEPRECATED: Use get_pending_blog_by_id instead.
+
+        Get pending blog for a user, optionally filtered by topic
+        """
+        if topic:
+            return await self.fetchrow("""
+                SELECT bs.blog_id, bs.user_id, bs.blog_topic, bs.status, bs.blog_content,
+                       bs.created_at, bs.updated_at, pb.current_stage
+                FROM blog_sessions bs
+                JOIN pending_blogs pb ON bs.blog_id = pb.blog_id
+                WHERE bs.user_id = $1 AND bs.blog_topic = $2
+                LIMIT 1
+            """, user_id, topic)
+        return await self.fetchrow("""
+            SELECT bs.blog_id, bs.user_id, bs.blog_topic, bs.status, bs.blog_content,
+                   bs.created_at, bs.updated_at, pb.current_stage
+            FROM blog_sessions bs
+            JOIN pending_blogs pb ON bs.blog_id = pb.blog_id
+            WHERE bs.user_id = $1
+            ORDER BY bs.updated_at DESC
+            LIMIT 1
+        """, user_id)
+
+    async def get_blog_state(self, blog_id: str) -> Optional[dict]:
+        """Get the current generation state for a blog"""
+        return await self.fetchrow("""
+            SELECT current_stage, iteration, is_completed, last_event_type, last_event_data
+            FROM blog_generation_state
+            WHERE blog_id = $1
+        """, blog_id)
+
+    async def close(self):
+        """Close the pool's connections"""
+        await self.pool.close()
+
+_db = None
+
+def __getattr__(name: str):
+    """Create the shared `db` instance on first access instead of at import time"""
+    global _db
+    if name == 'db':
+        if _db is None:
+            _db = AsyncDatabase()
+        return _db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,81 @@
+import copy
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules are flat and import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# Input sizes every scaled benchmark runs at; BENCHMARK_SIZES=10,100 trims a local run
+SIZES = [int(size) for size in os.getenv("BENCHMARK_SIZES", "10,100,1000,10000").split(",")]
+
+WORDS = (
+    "battery electrolyte lithium anode cathode cell density charge range vehicle "
+    "ceramic sulfide polymer dendrite separator pressure production automaker prototype "
+    "safety cost market capacity chemistry sodium voltage thermal cycle research"
+).split()
+
+
+def load_fixture(name: str) -> dict:
+    with open(FIXTURES / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def make_results(count: int, seed: int = 0) -> list:
+    """`count` Brave web results cloned from the recorded fixture with unique URLs and text.
+
+    Every fifth result reuses an earlier URL over http with tracking params so
+    the deduplicator has real work to do.
+    """
+    rng = random.Random(seed)
+    recorded = load_fixture("brave_web_search.json")["web"]["results"]
+    results = []
+    for i in range(count):
+        result = copy.deepcopy(recorded[i % len(recorded)])
+        if i % 5 == 4 and results:
+            source = results[rng.randrange(len(results))]
+            result['url'] = source['url'].replace("https://", "http://", 1) + "?utm_source=brave"
+            result['description'] = source['description']
+            result['extra_snippets'] = list(source['extra_snippets'])
+        else:
+            result['url'] = f"{result['url'].split('?')[0].rstrip('/')}/{i}"
+            result['description'] = sentence(rng, 30)
+            result['extra_snippets'] = [sentence(rng, 20) for _ in range(rng.randint(0, 4))]
+        results.append(result)
+    return results
+
+
+def make_summary(paragraphs: int, result_count: int, seed: int = 0) -> str:
+    """Markdown summary with a mix of single, list and out-of-range citations"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(paragraphs):
+        cited = sorted(rng.sample(range(1, result_count + 1), min(3, result_count)))
+        parts.append(
+            f"{sentence(rng, 25)} [{cited[0]}] {sentence(rng, 18)} "
+            f"[{', '.join(map(str, cited))}] {sentence(rng, 12)} [{result_count + 1}]"
+        )
+    return "\n\n".join(parts)
+
+
+def make_llm_response(blocks: int, seed: int = 0) -> str:
+    """Reasoning-model output with <think> blocks and a fenced JSON answer"""
+    rng = random.Random(seed)
+    thinking = "\n".join(f"<think>{sentence(rng, 60)}</think>\n{sentence(rng, 20)}" for _ in range(blocks))
+    payload = json.dumps({"terms": [sentence(rng, 4) for _ in range(blocks)]}, indent=2)
+    return f"{thinking}\n```json\n{payload}\n```\n"
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"n={size}")
+def size(request):
+    return request.param
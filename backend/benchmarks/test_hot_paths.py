@@ -0,0 +1,80 @@
+"""Micro-benchmarks for the CPU-bound steps of a search turn and blog generation.
+
+Everything runs offline against the recorded Brave fixtures in fixtures/ and
+synthetic inputs scaled from 10 to 10k items (see conftest.SIZES).
+
+Record a baseline, then compare a change against it:
+
+    uv run pytest benchmarks --benchmark-autosave
+    uv run pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Baselines are stored under .benchmarks/ and are machine specific, so only
+compare runs made on the same host.
+"""
+from conftest import make_llm_response, make_results, make_summary, load_fixture
+
+from blogger import process_llm_response
+from blog.reflection_search import ReflectionSearch
+from citations import CitationRewriter
+from dedup import deduplicate_results
+from rerank import bm25_scores
+from search import convert_search_to_text, fix_citations
+
+QUERY = "solid state batteries"
+
+
+def test_fix_citations(benchmark, size):
+    results = make_results(10)
+    summary = make_summary(size, len(results))
+    fixed = benchmark(fix_citations, summary, results)
+    assert results[0]['url'] in fixed or results[1]['url'] in fixed
+
+
+def test_citation_rewriter_streaming(benchmark, size):
+    """The same rewrite fed a few characters at a time, as the summary stream delivers it"""
+    results = make_results(10)
+    summary = make_summary(size, len(results))
+    chunks = [summary[i:i + 12] for i in range(0, len(summary), 12)]
+
+    def rewrite():
+        rewriter = CitationRewriter(results)
+        return "".join(rewriter.feed(chunk) for chunk in chunks) + rewriter.flush()
+
+    assert benchmark(rewrite) == fix_citations(summary, results)
+
+
+def test_convert_search_to_text(benchmark, size):
+    results = make_results(size)
+    text = benchmark(convert_search_to_text, results, query=QUERY)
+    assert text
+
+
+def test_bm25_scores(benchmark, size):
+    results = make_results(size)
+    scores = benchmark(bm25_scores, results, [QUERY, "battery electrolyte"])
+    assert len(scores) == size and max(scores) > 0
+
+
+def test_deduplicate_results(benchmark, size):
+    results = make_results(size)
+    unique = benchmark(deduplicate_results, results)
+    assert len(unique) < len(results) or size < 5
+
+
+def test_deduplicate_recorded_results(benchmark):
+    """The recorded response carries a mobile-host copy of its first result"""
+    results = load_fixture("brave_web_search.json")["web"]["results"]
+    unique = benchmark(deduplicate_results, results)
+    assert len(unique) == len(results) - 1
+
+
+def test_sanitize_json_text(benchmark, size):
+    text = make_llm_response(size)
+    sanitized = benchmark(ReflectionSearch("benchmark").sanitize_json_text, text)
+    assert "```" not in sanitized
+
+
+def test_process_llm_response(benchmark, size):
+    text = make_llm_response(size)
+    cleaned = benchmark(process_llm_response, text)
+    assert "<think>" not in cleaned
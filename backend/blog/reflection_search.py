@@ -1,14 +1,15 @@
 import json
-from litellm import completion, acompletion
+from llm import acompletion
 import re
 from typing import List, Optional, Dict
 from prompts import reflect_system_prompt
 import os
 
 class ReflectionSearch:
-    def __init__(self, model: str):
+    def __init__(self, model: str, api_base: Optional[str] = None):
         """Initialize reflection search with a specific LLM model"""
         self.model = model
+        self.api_base = api_base
         self.messages: List[Dict[str, str]] = []
         
     def sanitize_json_text(self, text: str) -> str:
@@ -33,6 +34,7 @@ class ReflectionSearch:
                 model=self.model,
                 messages=self.messages,
                 stream=True,
+                api_base=self.api_base,
             )
             
             accumulated_reflection = ""
@@ -116,9 +118,10 @@ class ReflectionSearch:
                     "content": retry_message
                 })
                 
-                retry_response = completion(
+                retry_response = await acompletion(
                     model=self.model,
                     messages=self.messages,
+                    api_base=self.api_base,
                 )
                 
                 retry_text = retry_response.choices[0].message.content
@@ -0,0 +1,116 @@
+import os
+import asyncio
+import logging
+import time
+import httpx
+from dotenv import load_dotenv
+from ratelimit import AdaptiveRateLimiter
+from resilience import CircuitBreaker, LatencyTracker
+from cassette import wrap_transport
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BRAVE_API_BASE = os.getenv('BRAVE_API_BASE', 'https://api.search.brave.com')
+
+# Shared pool limits and timeouts for every Brave call in the process
+BRAVE_MAX_CONNECTIONS = int(os.getenv('BRAVE_MAX_CONNECTIONS', '20'))
+BRAVE_MAX_KEEPALIVE = int(os.getenv('BRAVE_MAX_KEEPALIVE', '10'))
+BRAVE_KEEPALIVE_EXPIRY = float(os.getenv('BRAVE_KEEPALIVE_EXPIRY', '60'))
+BRAVE_TIMEOUT = float(os.getenv('BRAVE_TIMEOUT', '8'))
+BRAVE_CONNECT_TIMEOUT = float(os.getenv('BRAVE_CONNECT_TIMEOUT', '3'))
+
+# Subscription rate limit and adaptive concurrency bounds for all Brave traffic
+BRAVE_QPS = float(os.getenv('BRAVE_QPS', '20'))
+BRAVE_BURST = float(os.getenv('BRAVE_BURST', str(BRAVE_QPS)))
+BRAVE_MIN_CONCURRENCY = int(os.getenv('BRAVE_MIN_CONCURRENCY', '1'))
+BRAVE_MAX_CONCURRENCY = int(os.getenv('BRAVE_MAX_CONCURRENCY', '16'))
+BRAVE_MAX_RETRIES = int(os.getenv('BRAVE_MAX_RETRIES', '2'))
+# Hedge a search that is still running after this long until enough latencies are recorded
+BRAVE_HEDGE_DELAY = float(os.getenv('BRAVE_HEDGE_DELAY', '1.5'))
+
+_client: httpx.AsyncClient | None = None
+
+brave_limiter = AdaptiveRateLimiter(
+    qps=BRAVE_QPS,
+    burst=BRAVE_BURST,
+    initial_concurrency=BRAVE_MAX_CONCURRENCY // 2 or 1,
+    min_concurrency=BRAVE_MIN_CONCURRENCY,
+    max_concurrency=BRAVE_MAX_CONCURRENCY,
+)
+brave_breaker = CircuitBreaker("brave")
+brave_latency = LatencyTracker(default_delay=BRAVE_HEDGE_DELAY)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=BRAVE_MAX_CONNECTIONS,
+                max_keepalive_connections=BRAVE_MAX_KEEPALIVE,
+                keepalive_expiry=BRAVE_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client = httpx.AsyncClient(
+            base_url=BRAVE_API_BASE,
+            # Recorded or replayed when CASSETTE_MODE is set
+            transport=wrap_transport(transport),
+            timeout=httpx.Timeout(BRAVE_TIMEOUT, connect=BRAVE_CONNECT_TIMEOUT),
+            headers={
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip',
+            },
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client, called on application shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+async def brave_get(path: str, params: dict, timeout: float | None = None) -> dict:
+    """GET a Brave API endpoint through the shared pool and decode the JSON body.
+
+    Calls are paced by brave_limiter. A 429 shrinks the concurrency limit,
+    honours Retry-After and is retried up to BRAVE_MAX_RETRIES times. Other
+    failures count against brave_breaker, which fails fast while Brave is down.
+    """
+    client = get_client()
+    for attempt in range(BRAVE_MAX_RETRIES + 1):
+        async with brave_limiter.slot():
+            with brave_breaker.guard():
+                started = time.monotonic()
+                response = await client.get(
+                    path,
+                    params=params,
+                    headers={'X-Subscription-Token': os.getenv('BRAVE_API_KEY_BASE_AI')},
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                brave_latency.record(time.monotonic() - started)
+        if response.status_code != 429:
+            break
+        retry_after = retry_after_seconds(response)
+        brave_limiter.on_throttled(retry_after)
+        logger.warning(f"Brave rate limited {path} (attempt {attempt + 1}), retry after {retry_after}s")
+        if attempt < BRAVE_MAX_RETRIES and retry_after is None:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    response.raise_for_status()
+    brave_limiter.on_success()
+    return response.json()
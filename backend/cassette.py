@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# off, record or replay
+CASSETTE_MODE = os.getenv('CASSETTE_MODE', 'off').lower()
+CASSETTE_DIR = os.getenv('CASSETTE_DIR', 'cassettes')
+# "recorded" replays with the captured delays, "fast" as fast as possible
+CASSETTE_SPEED = os.getenv('CASSETTE_SPEED', 'recorded').lower()
+
+# Prompts embed the current time, which would make every key unique
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}T[\d:.]+')
+# Headers worth keeping on a recorded Brave response; the body is stored decoded
+RECORDED_HEADERS = {'content-type', 'retry-after'}
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+def make_key(kind: str, request: dict) -> str:
+    """Stable key for a request with timestamps normalized away"""
+    payload = TIMESTAMP_PATTERN.sub('<timestamp>', json.dumps(request, sort_keys=True, default=str))
+    return f"{kind}-{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+class Cassette:
+    """Recorded interactions on disk, one JSON file per request key.
+
+    Repeated identical requests are recorded in order and replayed in the same
+    order; once a key's recordings run out, the last one is served again.
+    """
+
+    def __init__(self, mode: str, directory: str, speed: str):
+        self.mode = mode
+        self.directory = Path(directory)
+        self.fast = speed == 'fast'
+        self.lock = threading.Lock()
+        self.recorded_keys = set()
+        self.cursors = {}
+        self.entries = {}
+        if mode == 'record':
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def append(self, key: str, request: dict, response: dict):
+        with self.lock:
+            # The first recording of a key in this process replaces an older cassette
+            if key in self.recorded_keys:
+                entries = json.loads(self.path(key).read_text())
+            else:
+                entries = []
+                self.recorded_keys.add(key)
+            entries.append({"request": request, "response": response})
+            tmp_path = self.path(key).with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entries, indent=2, default=str))
+            tmp_path.replace(self.path(key))
+
+    def next(self, key: str) -> dict:
+        with self.lock:
+            if key not in self.entries:
+                try:
+                    self.entries[key] = json.loads(self.path(key).read_text())
+                except FileNotFoundError:
+                    raise CassetteMissError(f"No recording for {key} in {self.directory}")
+            entries = self.entries[key]
+            cursor = self.cursors.get(key, 0)
+            self.cursors[key] = cursor + 1
+            return entries[min(cursor, len(entries) - 1)]["response"]
+
+    async def wait_until(self, started: float, offset: float):
+        """Sleep until `offset` seconds after `started`, unless replaying fast"""
+        if not self.fast:
+            await asyncio.sleep(max(0.0, started + offset - time.monotonic()))
+
+    def sleep_until(self, started: float, offset: float):
+        if not self.fast:
+            time.sleep(max(0.0, started + offset - time.monotonic()))
+
+
+cassette = Cassette(CASSETTE_MODE, CASSETTE_DIR, CASSETTE_SPEED)
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records responses from the wrapped transport or replays them"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.transport = transport
+        self.cassette = cassette
+
+    def request_key(self, request: httpx.Request) -> tuple[str, dict]:
+        # Only the method, path and query identify a request; auth headers stay out of the cassette
+        details = {
+            "method": request.method,
+            "path": request.url.path,
+            "params": sorted(request.url.params.multi_items()),
+        }
+        return make_key("http", details), details
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, details = self.request_key(request)
+        started = time.monotonic()
+        if self.cassette.replaying:
+            recorded = self.cassette.next(key)
+            await self.cassette.wait_until(started, recorded["elapsed"])
+            return httpx.Response(
+                recorded["status_code"],
+                headers=recorded["headers"],
+                content=recorded["body"].encode(),
+                request=request,
+            )
+
+        response = await self.transport.handle_async_request(request)
+        if not self.cassette.recording:
+            return response
+        # Read and decode the body so it can be stored, then hand back an equivalent response
+        body = await response.aread()
+        headers = {name: value for name, value in response.headers.items() if name.lower() in RECORDED_HEADERS}
+        self.cassette.append(key, details, {
+            "status_code": response.status_code,
+            "headers": headers,
+            "body": body.decode(),
+            "elapsed": time.monotonic() - started,
+        })
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def wrap_transport(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Route a client's traffic through the cassette when CASSETTE_MODE is set"""
+    if cassette.mode == 'off':
+        return transport
+    return CassetteTransport(transport, cassette)
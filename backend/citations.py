@@ -0,0 +1,75 @@
+import re
+
+# A complete plain citation such as [3] or [1, 4]
+CITATION_PATTERN = re.compile(r'\[(\d+(?:,\s*\d+)*)\]')
+# Something at the end of the text that could still grow into a citation, e.g. "[1" or "[1, "
+OPEN_CITATION_PATTERN = re.compile(r'\[\d*(?:,\s*\d*)*\]?\Z')
+# Never hold back more than this many characters waiting for a citation to close
+MAX_PENDING_CHARS = 64
+
+
+class CitationRewriter:
+    """Incrementally turn [n] citations into [n](url) links over a stream of chunks.
+
+    Only a possibly-open "[..." tail is buffered between chunks, so each
+    character is scanned once and a citation split across chunks is still
+    rewritten. Citations that are already links are left untouched.
+    """
+
+    def __init__(self, search_results: list):
+        self.links = [(result.get('url') or '').strip() for result in search_results]
+        self.pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Rewrite a chunk, returning the text that is safe to emit now"""
+        return self._rewrite(self.pending + chunk, final=False)
+
+    def flush(self) -> str:
+        """Rewrite and return whatever is still buffered at the end of the stream"""
+        return self._rewrite(self.pending, final=True)
+
+    def _rewrite(self, text: str, final: bool) -> str:
+        self.pending = ""
+        out = []
+        pos = 0
+        length = len(text)
+        while True:
+            start = text.find('[', pos)
+            if start == -1:
+                out.append(text[pos:])
+                break
+            out.append(text[pos:start])
+
+            match = CITATION_PATTERN.match(text, start)
+            if match:
+                end = match.end()
+                if end == length and not final:
+                    # Need the next character to know whether this is already a link
+                    self.pending = text[start:]
+                    break
+                if end < length and text[end] == '(':
+                    out.append(text[start:end])
+                else:
+                    out.append(self._link(match.group(1)))
+                pos = end
+                continue
+
+            if (not final and length - start <= MAX_PENDING_CHARS
+                    and OPEN_CITATION_PATTERN.match(text, start)):
+                self.pending = text[start:]
+                break
+
+            out.append('[')
+            pos = start + 1
+        return "".join(out)
+
+    def _link(self, numbers: str) -> str:
+        citation_texts = []
+        for number in numbers.split(','):
+            citation_number = int(number)
+            if 1 <= citation_number <= len(self.links):
+                link = self.links[citation_number - 1]
+                citation_texts.append(f'[{citation_number}]({link})' if link else "")
+            else:
+                citation_texts.append(f"[{citation_number}]")
+        return ', '.join(citation_texts)
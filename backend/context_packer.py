@@ -0,0 +1,92 @@
+import os
+from dotenv import load_dotenv
+from rerank import bm25_scores
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '4000'))
+# Rough chars-per-token ratio for English text; close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+CONTEXT_HEADER = "Search Results Overview:\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_result(idx: int, result: dict) -> str:
+    return (
+        f"[{idx}] Title: {result.get('title', 'No title')}\n"
+        f"Citation Link: {result.get('url', 'No link')}\n"
+        f"Published: {result.get('page_age', 'Date not available')}\n"
+        f"Description: {result.get('description', 'No description')}\n"
+    )
+
+
+def pack_context(results: list, query: str = None, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 scores: list[float] = None) -> tuple[str, dict]:
+    """Pack the most relevant results into the prompt context without exceeding token_budget.
+
+    Results keep their 1-based position in `results` as citation number, so
+    links produced by fix_citations still point at the right result even when
+    results are reordered or dropped. Returns the context text and a report of
+    what was packed and how many tokens were saved.
+
+    Pass the scores from rerank_with_scores to rank by them instead of scoring
+    the results against query again.
+    """
+    budget = token_budget * CHARS_PER_TOKEN - len(CONTEXT_HEADER)
+    if scores is None:
+        scores = bm25_scores(results, [query])
+    ranked = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)
+
+    full_chars = len(CONTEXT_HEADER)
+    blocks = {}
+    snippets = {}
+    for i in ranked:
+        result = results[i]
+        block = format_result(i + 1, result)
+        result_snippets = [f"- {snippet}\n" for snippet in result.get('extra_snippets') or []]
+        full_chars += len(block) + 1
+        if result_snippets:
+            full_chars += len("Extra Information:\n") + sum(len(s) for s in result_snippets)
+
+        # Always keep the best result so the prompt is never empty
+        if len(block) + 1 <= budget or not blocks:
+            blocks[i] = block
+            snippets[i] = result_snippets
+            budget -= len(block) + 1
+
+    # Add snippets one at a time, best results first, until the budget runs out
+    included_snippets = {i: [] for i in blocks}
+    snippets_dropped = 0
+    for i in blocks:
+        for snippet in snippets[i]:
+            cost = len(snippet) + (0 if included_snippets[i] else len("Extra Information:\n"))
+            if cost <= budget:
+                included_snippets[i].append(snippet)
+                budget -= cost
+            else:
+                snippets_dropped += 1
+
+    parts = [CONTEXT_HEADER]
+    for i, block in blocks.items():
+        parts.append(block)
+        if included_snippets[i]:
+            parts.append("Extra Information:\n")
+            parts.extend(included_snippets[i])
+        parts.append("\n")
+    text = "".join(parts).strip()
+
+    full_tokens = (full_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    packed_tokens = estimate_tokens(text)
+    report = {
+        "results_total": len(results),
+        "results_included": len(blocks),
+        "snippets_dropped": snippets_dropped,
+        "full_tokens": full_tokens,
+        "packed_tokens": packed_tokens,
+        "saved_tokens": max(0, full_tokens - packed_tokens),
+    }
+    return text, report
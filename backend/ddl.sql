@@ -37,6 +37,7 @@ CREATE TABLE search_results (
     type TEXT,
     subtype TEXT,
     is_live BOOLEAN DEFAULT false,
+    position INT, -- Rank within the message's results, since they share created_at
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -77,6 +78,14 @@ CREATE TABLE pending_chats (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Rolling digest of the older turns of a chat, folded in incrementally
+CREATE TABLE chat_history_digests (
+    chat_id UUID PRIMARY KEY REFERENCES chat_sessions(chat_id) ON DELETE CASCADE,
+    digest TEXT NOT NULL,
+    turns_covered INT NOT NULL, -- How many of the oldest messages the digest summarizes
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for better query performance
 CREATE INDEX idx_chat_messages_chat_id ON chat_messages(chat_id);
 CREATE INDEX idx_search_results_chat_id ON search_results(chat_id);
@@ -129,13 +138,14 @@ CREATE TABLE blog_search_results (
     description TEXT,
     page_age TEXT,
     summary TEXT, -- Summary of the search result content
+    position INT, -- Order within the batch stored for its term
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Table to store blog generation progress for resumption
 CREATE TABLE blog_generation_state (
     state_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    blog_id UUID REFERENCES blog_sessions(blog_id) ON DELETE CASCADE,
+    blog_id UUID UNIQUE REFERENCES blog_sessions(blog_id) ON DELETE CASCADE, -- One row per blog, upserted
     current_stage VARCHAR(50) NOT NULL, -- BREAKDOWN, SEARCH, REFLECTION, PLAN, WRITE
     iteration INT DEFAULT 0, -- Current iteration for multi-step stages
     is_completed BOOLEAN DEFAULT false,
@@ -159,7 +169,6 @@ CREATE INDEX idx_blog_sessions_status ON blog_sessions(status);
 CREATE INDEX idx_blog_search_terms_blog_id ON blog_search_terms(blog_id);
 CREATE INDEX idx_blog_search_results_blog_id ON blog_search_results(blog_id);
 CREATE INDEX idx_blog_search_results_term_id ON blog_search_results(term_id);
-CREATE INDEX idx_blog_generation_state_blog_id ON blog_generation_state(blog_id);
 
 -- Triggers to auto-update updated_at for blog tables
 CREATE TRIGGER update_blog_sessions_updated_at
@@ -0,0 +1,129 @@
+import hashlib
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import numpy as np
+
+# Click and campaign IDs that never change the page served (utm_* is matched by prefix).
+# Generic names like ref, src or output are left alone since sites use them for content.
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'gbraid', 'wbraid', 'dclid', 'msclkid', 'yclid', 'twclid', 'ttclid',
+    'li_fat_id', 'igshid', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'mkt_tok', 'vero_id'
+}
+# Host prefixes that serve the same page as the bare domain
+HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+WORD_PATTERN = re.compile(r'\w+')
+# Below this many shingles a fingerprint is too noisy to compare
+MIN_SHINGLES = 8
+SIMHASH_BITS = 64
+BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+# Near-duplicate threshold. Four 16-bit bands guarantee any pair within 3 bits shares a band.
+MAX_HAMMING_DISTANCE = 3
+BANDS = 4
+BAND_BITS = SIMHASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so scheme, www/mobile/AMP variants and tracking params compare equal"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = (parts.hostname or '').lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path
+    if path.endswith('/amp') or path.endswith('/amp/'):
+        path = path[:path.rindex('/amp')]
+    elif path.endswith('.amp'):
+        path = path[:-len('.amp')]
+    path = path.rstrip('/')
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ))
+    # Scheme is dropped on purpose so http and https collapse together
+    return urlunsplit(('', host, path, query, ''))
+
+
+@lru_cache(maxsize=1 << 16)
+def word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest())
+
+
+def rotate(hashes: np.ndarray, bits: int) -> np.ndarray:
+    return (hashes << np.uint64(bits)) | (hashes >> np.uint64(SIMHASH_BITS - bits))
+
+
+def simhash(text: str) -> int | None:
+    """64-bit SimHash over three-word shingles, or None when the text is too short to compare.
+
+    Each word is hashed once and a shingle's hash is its words' hashes rotated
+    by position and XORed together, so all the bit work runs on uint64 arrays.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    hashes = np.fromiter((word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+    shingles = np.unique(hashes[:-2] ^ rotate(hashes[1:-1], 21) ^ rotate(hashes[2:], 42))
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    # Majority vote per bit position: count the shingles with each bit set
+    counts = ((shingles[:, None] >> BIT_SHIFTS) & np.uint64(1)).sum(axis=0)
+    bits = (counts > len(shingles) // 2).astype(np.uint64)
+    return int((bits << BIT_SHIFTS).sum())
+
+
+def result_text(result: dict) -> str:
+    parts = [result.get('title') or '', result.get('description') or '']
+    parts.extend(result.get('extra_snippets') or [])
+    return " ".join(parts)
+
+
+class Deduplicator:
+    """Stateful filter that drops results already seen by canonical URL or by near-identical content.
+
+    Fingerprints are indexed by band so each lookup only compares against the
+    few results that share a band, keeping the whole pass linear.
+    """
+
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.seen_urls = set()
+        self.bands: dict[tuple[int, int], list[int]] = {}
+
+    def add(self, result: dict) -> bool:
+        """Record a result and return True if it is not a duplicate of anything seen before"""
+        url = result.get('url')
+        if not url:
+            return False
+        canonical_url = canonicalize_url(url)
+        if canonical_url in self.seen_urls:
+            return False
+
+        fingerprint = simhash(result_text(result))
+        if fingerprint is not None:
+            keys = [(band, (fingerprint >> (band * BAND_BITS)) & BAND_MASK) for band in range(BANDS)]
+            for key in keys:
+                for other in self.bands.get(key, ()):
+                    if (fingerprint ^ other).bit_count() <= self.max_distance:
+                        return False
+            for key in keys:
+                self.bands.setdefault(key, []).append(fingerprint)
+
+        self.seen_urls.add(canonical_url)
+        return True
+
+    def filter(self, results: list) -> list:
+        return [result for result in results if self.add(result)]
+
+
+def deduplicate_results(results: list) -> list:
+    """Remove results that repeat an earlier one by canonical URL or near-identical content"""
+    return Deduplicator().filter(results)
@@ -0,0 +1,85 @@
+import logging
+import os
+from dotenv import load_dotenv
+from context_packer import estimate_tokens
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Most recent turns passed to the models verbatim; older ones are folded into a digest
+HISTORY_RECENT_TURNS = int(os.getenv('HISTORY_RECENT_TURNS', '3'))
+# Token budget for the whole history, digest included
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '6000'))
+# Room kept for the digest; the digest prompt asks for roughly this many tokens
+HISTORY_DIGEST_TOKENS = int(os.getenv('HISTORY_DIGEST_TOKENS', '800'))
+
+DIGEST_HEADER = "Digest of the earlier conversation:\n"
+
+
+def turn_tokens(turn: dict) -> int:
+    return estimate_tokens(turn['user_query']) + estimate_tokens(turn['summary'])
+
+
+def turn_messages(turn: dict) -> list[dict]:
+    return [
+        {"role": "user", "content": turn['user_query']},
+        {"role": "assistant", "content": turn['summary']},
+    ]
+
+
+def needs_digest(turns: list, recent_turns: int, token_budget: int) -> bool:
+    """Whether the history is too long to send verbatim"""
+    return len(turns) > recent_turns or sum(turn_tokens(turn) for turn in turns) > token_budget
+
+
+def split_point(turns: list, covered: int, recent_turns: int, token_budget: int) -> int:
+    """Index of the first turn kept verbatim.
+
+    Keeps at most recent_turns turns, and fewer if they don't fit in token_budget,
+    but always the latest one. Never moves before the turns the digest already covers.
+    """
+    split = max(covered, len(turns) - recent_turns, 0)
+    used = sum(turn_tokens(turn) for turn in turns[split:])
+    while split < len(turns) - 1 and used > token_budget:
+        used -= turn_tokens(turns[split])
+        split += 1
+    return split
+
+
+async def compact_history(db, chat_id: str, turns: list, fold,
+                          recent_turns: int = HISTORY_RECENT_TURNS,
+                          token_budget: int = HISTORY_TOKEN_BUDGET) -> list[dict]:
+    """Chat history for the prompts: a stored digest of older turns plus the latest turns verbatim.
+
+    `turns` are the chat's messages oldest first, each with user_query and summary.
+    `fold(digest, turns)` returns the digest extended with the given turns. Only turns
+    that newly fall out of the verbatim window are folded, and the result is stored
+    per chat, so each turn is summarized once rather than on every request.
+    """
+    if not turns:
+        return []
+
+    stored = await db.get_history_digest(chat_id)
+    digest = stored['digest'] if stored else ""
+    covered = min(stored['turns_covered'], len(turns)) if stored else 0
+
+    verbatim_budget = token_budget
+    if covered or needs_digest(turns, recent_turns, token_budget):
+        verbatim_budget -= HISTORY_DIGEST_TOKENS
+    split = split_point(turns, covered, recent_turns, verbatim_budget)
+    if split > covered:
+        try:
+            digest = await fold(digest, turns[covered:split])
+            covered = split
+            await db.save_history_digest(chat_id, digest, covered)
+        except Exception as e:
+            # If folding failed the turns are sent verbatim, which beats losing them
+            logger.warning(f"Failed to update the history digest for chat_id {chat_id}: {str(e)}")
+
+    messages = []
+    if digest:
+        messages.append({"role": "system", "content": DIGEST_HEADER + digest})
+    for turn in turns[covered:]:
+        messages.extend(turn_messages(turn))
+    return messages
@@ -0,0 +1,104 @@
+"""litellm entry points that go through the record/replay cassette.
+
+Import completion and acompletion from here instead of litellm. With
+CASSETTE_MODE unset they call litellm directly.
+"""
+import time
+from types import SimpleNamespace
+import litellm
+from cassette import cassette, make_key
+
+# Arguments that identify a completion; keys, endpoints and timeouts do not change the answer
+IGNORED_KWARGS = {'api_key', 'api_base', 'timeout'}
+
+
+def request_details(model: str, messages: list, kwargs: dict) -> dict:
+    return {
+        "model": model,
+        "messages": messages,
+        **{name: value for name, value in kwargs.items() if name not in IGNORED_KWARGS},
+    }
+
+
+def to_namespace(value):
+    """Recorded JSON back into an object with the attribute access litellm responses have"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{name: to_namespace(item) for name, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
+
+
+def dump(response) -> dict:
+    return response.model_dump()
+
+
+async def replay_stream(recorded: dict, started: float):
+    for chunk in recorded["chunks"]:
+        await cassette.wait_until(started, chunk["offset"])
+        yield to_namespace(chunk["data"])
+
+
+def replay_stream_sync(recorded: dict, started: float):
+    for chunk in recorded["chunks"]:
+        cassette.sleep_until(started, chunk["offset"])
+        yield to_namespace(chunk["data"])
+
+
+async def record_stream(response, key: str, details: dict, started: float):
+    chunks = []
+    async for chunk in response:
+        chunks.append({"offset": time.monotonic() - started, "data": dump(chunk)})
+        yield chunk
+    # Only complete streams are recorded
+    cassette.append(key, details, {"chunks": chunks})
+
+
+def record_stream_sync(response, key: str, details: dict, started: float):
+    chunks = []
+    for chunk in response:
+        chunks.append({"offset": time.monotonic() - started, "data": dump(chunk)})
+        yield chunk
+    cassette.append(key, details, {"chunks": chunks})
+
+
+async def acompletion(model: str, messages: list, **kwargs):
+    if cassette.mode == 'off':
+        return await litellm.acompletion(model=model, messages=messages, **kwargs)
+
+    details = request_details(model, messages, kwargs)
+    key = make_key("llm", details)
+    started = time.monotonic()
+    if cassette.replaying:
+        recorded = cassette.next(key)
+        if kwargs.get('stream'):
+            return replay_stream(recorded, started)
+        await cassette.wait_until(started, recorded["elapsed"])
+        return to_namespace(recorded["data"])
+
+    response = await litellm.acompletion(model=model, messages=messages, **kwargs)
+    if kwargs.get('stream'):
+        return record_stream(response, key, details, started)
+    cassette.append(key, details, {"elapsed": time.monotonic() - started, "data": dump(response)})
+    return response
+
+
+def completion(model: str, messages: list, **kwargs):
+    if cassette.mode == 'off':
+        return litellm.completion(model=model, messages=messages, **kwargs)
+
+    details = request_details(model, messages, kwargs)
+    key = make_key("llm", details)
+    started = time.monotonic()
+    if cassette.replaying:
+        recorded = cassette.next(key)
+        if kwargs.get('stream'):
+            return replay_stream_sync(recorded, started)
+        cassette.sleep_until(started, recorded["elapsed"])
+        return to_namespace(recorded["data"])
+
+    response = litellm.completion(model=model, messages=messages, **kwargs)
+    if kwargs.get('stream'):
+        return record_stream_sync(response, key, details, started)
+    cassette.append(key, details, {"elapsed": time.monotonic() - started, "data": dump(response)})
+    return response
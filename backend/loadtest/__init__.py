@@ -0,0 +1,3 @@
+"""
+Load-test harness: local Brave and LLM stand-ins plus an SSE load driver.
+"""
@@ -0,0 +1,176 @@
+"""Open many concurrent SSE streams against the backend and report latency percentiles.
+
+    uv run python -m loadtest.driver --mode search --concurrency 20 --requests 200
+    uv run python -m loadtest.driver --mode blog --concurrency 5 --requests 10
+
+Each request creates its chat session or pending blog first; that setup is not
+timed. Per stream it records time to the first event, time to the first summary
+token (summary_part, or blog_part for blogs), total latency and the longest gap
+between two events, which is where a blocked event loop shows up.
+"""
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+FIRST_TOKEN_EVENTS = {"search": "summary_part", "blog": "blog_part"}
+ERROR_EVENTS = {"error", "warning"}
+
+
+@dataclass
+class StreamStats:
+    first_event: float = None
+    first_token: float = None
+    total: float = None
+    max_gap: float = 0.0
+    events: int = 0
+    errors: list = field(default_factory=list)
+
+
+def percentile(values: list, pct: float) -> float | None:
+    """Nearest-rank percentile, None for an empty sample"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def token_text(data: str) -> str:
+    """Text carried by a summary_part or blog_part event"""
+    payload = json.loads(data)
+    return payload.get("content", "") if isinstance(payload, dict) else payload
+
+
+async def read_events(response: httpx.Response):
+    """Yield (event, data) pairs from a text/event-stream response"""
+    event, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+
+async def create_stream_url(client: httpx.AsyncClient, mode: str, query: str) -> str:
+    if mode == "search":
+        response = await client.post("/create-session", json={"chat_title": query, "query": query})
+        response.raise_for_status()
+        return f"/stream-search-with-history?chat_id={response.json()['chat_id']}"
+    response = await client.post("/create-pending-blog", json={"blog_topic": query})
+    response.raise_for_status()
+    return f"/stream-blog-generation?blog_id={response.json()['blog_id']}"
+
+
+async def run_stream(client: httpx.AsyncClient, mode: str, url: str) -> StreamStats:
+    stats = StreamStats()
+    first_token_event = FIRST_TOKEN_EVENTS[mode]
+    started = last = time.monotonic()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        async for event, data in read_events(response):
+            now = time.monotonic()
+            stats.events += 1
+            stats.max_gap = max(stats.max_gap, now - last)
+            last = now
+            if stats.first_event is None:
+                stats.first_event = now - started
+            if event == first_token_event and stats.first_token is None and token_text(data):
+                stats.first_token = now - started
+            if event in ERROR_EVENTS:
+                stats.errors.append(f"{event}: {data[:200]}")
+    stats.total = time.monotonic() - started
+    return stats
+
+
+async def worker(client: httpx.AsyncClient, args, queue: asyncio.Queue, results: list):
+    while True:
+        try:
+            index = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        query = args.queries[index % len(args.queries)]
+        try:
+            url = await create_stream_url(client, args.mode, query)
+            results.append(await run_stream(client, args.mode, url))
+        except Exception as e:
+            results.append(StreamStats(errors=[f"request failed: {e!r}"]))
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    completed = [stats for stats in results if stats.total is not None]
+    events = sum(stats.events for stats in results)
+    metrics = {
+        "time_to_first_event": [stats.first_event for stats in completed if stats.first_event is not None],
+        "time_to_first_token": [stats.first_token for stats in completed if stats.first_token is not None],
+        "total_latency": [stats.total for stats in completed],
+        "max_event_gap": [stats.max_gap for stats in completed],
+    }
+    return {
+        "requests": len(results),
+        "completed": len(completed),
+        "with_errors": sum(1 for stats in results if stats.errors),
+        "elapsed_s": round(elapsed, 3),
+        "events": events,
+        "events_per_s": round(events / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {
+            name: {
+                f"p{pct}": round(value, 3) if (value := percentile(values, pct)) is not None else None
+                for pct in (50, 95, 99)
+            }
+            for name, values in metrics.items()
+        },
+        "sample_errors": [error for stats in results for error in stats.errors][:10],
+    }
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout, connect=10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        queue = asyncio.Queue()
+        for index in range(args.requests):
+            queue.put_nowait(index)
+        results = []
+        started = time.monotonic()
+        await asyncio.gather(*(worker(client, args, queue, results) for _ in range(args.concurrency)))
+        report = summarize(results, time.monotonic() - started)
+        try:
+            report["server_metrics"] = (await client.get("/metrics")).json()
+        except (httpx.HTTPError, ValueError):
+            pass
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mode", choices=sorted(FIRST_TOKEN_EVENTS), default="search")
+    parser.add_argument("--concurrency", type=int, default=10, help="Streams open at once")
+    parser.add_argument("--requests", type=int, default=50, help="Streams to run in total")
+    parser.add_argument("--timeout", type=float, default=300, help="Read timeout per stream in seconds")
+    parser.add_argument("--query", dest="queries", action="append",
+                        help="Query or blog topic, repeatable; repeats exercise the caches")
+    parser.add_argument("--unique-queries", action="store_true",
+                        help="Suffix every query with its request number so nothing is shared")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    args.queries = args.queries or ["solid state batteries"]
+    if args.unique_queries:
+        args.queries = [f"{args.queries[i % len(args.queries)]} {i}" for i in range(args.requests)]
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,197 @@
+"""Local stand-ins for the Brave Search API and an OpenAI-compatible LLM endpoint.
+
+Run it, then point the backend at it:
+
+    uv run python -m loadtest.stubs
+    BRAVE_API_BASE=http://127.0.0.1:8100 LLM_API_BASE=http://127.0.0.1:8100/v1 \\
+    LITE_LLM_MODEL=openai/stub-lite LLM_MODEL=openai/stub \\
+    BLOG_LITE_LLM_MODEL=openai/stub-lite BLOG_THINKING_LLM_MODEL=openai/stub-thinking \\
+    BLOG_WRITER_LLM_MODEL=openai/stub GEMINI_API_KEY=stub OPENAI_API_KEY=stub \\
+    uv run python app.py
+
+Latencies are drawn from a lognormal distribution around the configured median;
+a sigma of 0 makes them fixed. Replies are deterministic for a given prompt, so
+repeated queries exercise the caches the same way real traffic would.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_HOST = os.getenv('STUB_HOST', '127.0.0.1')
+STUB_PORT = int(os.getenv('STUB_PORT', '8100'))
+
+BRAVE_LATENCY_MS = float(os.getenv('STUB_BRAVE_LATENCY_MS', '350'))
+BRAVE_LATENCY_SIGMA = float(os.getenv('STUB_BRAVE_LATENCY_SIGMA', '0.4'))
+# Fraction of Brave requests answered with a 429 to exercise the rate limiter
+BRAVE_THROTTLE_RATE = float(os.getenv('STUB_BRAVE_THROTTLE_RATE', '0'))
+
+LLM_TTFT_MS = float(os.getenv('STUB_LLM_TTFT_MS', '600'))
+LLM_TTFT_SIGMA = float(os.getenv('STUB_LLM_TTFT_SIGMA', '0.5'))
+LLM_TOKENS_PER_SEC = float(os.getenv('STUB_LLM_TOKENS_PER_SEC', '80'))
+# Tokens sent per streamed chunk; real providers batch a few tokens per frame
+LLM_TOKENS_PER_CHUNK = int(os.getenv('STUB_LLM_TOKENS_PER_CHUNK', '4'))
+LLM_STREAM_TOKENS = int(os.getenv('STUB_LLM_STREAM_TOKENS', '600'))
+LLM_LINES = int(os.getenv('STUB_LLM_LINES', '3'))
+
+FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+# Prompts embed the current time, which would otherwise make every reply unique
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}T[\d:.]+')
+
+WORDS = (
+    "battery electrolyte lithium anode cathode cell density charge range vehicle "
+    "ceramic sulfide polymer dendrite separator pressure production automaker prototype "
+    "safety cost market capacity chemistry sodium voltage thermal cycle research"
+).split()
+
+app = FastAPI()
+
+with open(FIXTURES / "brave_web_search.json", encoding="utf-8") as f:
+    web_fixture = json.load(f)
+with open(FIXTURES / "brave_image_search.json", encoding="utf-8") as f:
+    image_fixture = json.load(f)
+
+
+def sample_delay(median_ms: float, sigma: float) -> float:
+    """Seconds drawn from a lognormal distribution with the given median"""
+    return median_ms / 1000 * math.exp(random.gauss(0, sigma)) if sigma > 0 else median_ms / 1000
+
+
+def seeded_random(*parts: str) -> random.Random:
+    text = TIMESTAMP_PATTERN.sub('', "\n".join(parts))
+    return random.Random(hashlib.sha1(text.encode()).digest())
+
+
+def phrase(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def query_slug(query: str) -> str:
+    return hashlib.sha1(query.encode()).hexdigest()[:10]
+
+
+async def brave_delay() -> JSONResponse | None:
+    """Simulate Brave latency and throttling; returns a 429 response when throttled"""
+    await asyncio.sleep(sample_delay(BRAVE_LATENCY_MS, BRAVE_LATENCY_SIGMA))
+    if random.random() < BRAVE_THROTTLE_RATE:
+        return JSONResponse(status_code=429, content={"type": "ErrorResponse"}, headers={"Retry-After": "1"})
+    return None
+
+
+@app.get("/res/v1/web/search")
+async def web_search(q: str, count: int = 5, country: str = None):
+    throttled = await brave_delay()
+    if throttled is not None:
+        return throttled
+    slug = query_slug(q)
+    recorded = web_fixture["web"]["results"]
+    results = []
+    for i in range(count):
+        result = copy.deepcopy(recorded[i % len(recorded)])
+        result['url'] = f"{result['url'].split('?')[0].rstrip('/')}/{slug}-{i}"
+        results.append(result)
+    response = copy.deepcopy(web_fixture)
+    response["query"]["original"] = q
+    response["web"]["results"] = results
+    return JSONResponse(response)
+
+
+@app.get("/res/v1/images/search")
+async def image_search(q: str, count: int = 5, country: str = None):
+    throttled = await brave_delay()
+    if throttled is not None:
+        return throttled
+    response = copy.deepcopy(image_fixture)
+    response["query"]["original"] = q
+    response["results"] = response["results"][:count]
+    return JSONResponse(response)
+
+
+def llm_reply(messages: list, stream: bool) -> list[str]:
+    """Tokens of a plausible reply for the kind of prompt the backend sends.
+
+    Reflection (the only conversation with a system prompt) gets a think block and a
+    web_search tool call, streamed summaries and blog posts get cited prose, and
+    everything else (breakdown, suggestions, plans) gets short lines.
+    """
+    rng = seeded_random(*(message.get("content") or "" for message in messages))
+    if any(message.get("role") == "system" for message in messages):
+        tools = [{"tool": "web_search", "parameters": [phrase(rng, 3) for _ in range(2)]}]
+        text = f"<think>{phrase(rng, 40)}</think>{json.dumps(tools)}"
+        return [word + " " for word in text.split(" ")]
+    if stream:
+        tokens = []
+        while len(tokens) < LLM_STREAM_TOKENS:
+            tokens.extend(word + " " for word in phrase(rng, 25).split())
+            tokens.append(f"[{rng.randint(1, 5)}].\n\n" if rng.random() < 0.3 else f"[{rng.randint(1, 5)}]. ")
+        return tokens
+    lines = "\n".join(phrase(rng, 4) for _ in range(LLM_LINES))
+    return [word + " " for word in lines.split(" ")]
+
+
+def completion_chunk(completion_id: str, model: str, delta: dict, finish_reason: str = None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def stream_tokens(completion_id: str, model: str, tokens: list[str]):
+    yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+    for start in range(0, len(tokens), LLM_TOKENS_PER_CHUNK):
+        batch = tokens[start:start + LLM_TOKENS_PER_CHUNK]
+        await asyncio.sleep(len(batch) / LLM_TOKENS_PER_SEC)
+        yield completion_chunk(completion_id, model, {"content": "".join(batch)})
+    yield completion_chunk(completion_id, model, {}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    stream = bool(body.get("stream"))
+    tokens = llm_reply(body.get("messages", []), stream)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    await asyncio.sleep(sample_delay(LLM_TTFT_MS, LLM_TTFT_SIGMA))
+    if stream:
+        return StreamingResponse(stream_tokens(completion_id, model, tokens), media_type="text/event-stream")
+
+    await asyncio.sleep(len(tokens) / LLM_TOKENS_PER_SEC)
+    return JSONResponse({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(tokens).strip()},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": len(tokens),
+            "total_tokens": len(tokens),
+        },
+    })
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=STUB_HOST, port=STUB_PORT, log_level="warning")
@@ -0,0 +1,43 @@
+-- One blog_generation_state row per blog, for databases created before
+-- ddl.sql made blog_id UNIQUE. Safe to run more than once:
+--   psql "$DATABASE_URL" -f migrations/001_blog_generation_state_unique_blog_id.sql
+
+BEGIN;
+
+-- Keep only the most recently updated row of each blog
+DELETE FROM blog_generation_state
+WHERE state_id IN (
+    SELECT state_id FROM (
+        SELECT state_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY blog_id
+                   ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, state_id
+               ) AS row_number
+        FROM blog_generation_state
+        WHERE blog_id IS NOT NULL
+    ) ranked
+    WHERE row_number > 1
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'blog_generation_state'::regclass
+          AND contype = 'u'
+          AND conkey = ARRAY[(
+              SELECT attnum FROM pg_attribute
+              WHERE attrelid = 'blog_generation_state'::regclass AND attname = 'blog_id'
+          )]
+    ) THEN
+        -- Same name Postgres gives the inline UNIQUE in ddl.sql
+        ALTER TABLE blog_generation_state
+            ADD CONSTRAINT blog_generation_state_blog_id_key UNIQUE (blog_id);
+    END IF;
+END
+$$;
+
+-- The unique constraint's index replaces the old plain one
+DROP INDEX IF EXISTS idx_blog_generation_state_blog_id;
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Rolling chat digests, for databases created before ddl.sql had the table.
+-- Safe to run more than once:
+--   psql "$DATABASE_URL" -f migrations/002_chat_history_digests.sql
+
+CREATE TABLE IF NOT EXISTS chat_history_digests (
+    chat_id UUID PRIMARY KEY REFERENCES chat_sessions(chat_id) ON DELETE CASCADE,
+    digest TEXT NOT NULL,
+    turns_covered INT NOT NULL, -- How many of the oldest messages the digest summarizes
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
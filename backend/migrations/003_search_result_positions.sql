@@ -0,0 +1,8 @@
+-- Explicit result order, for databases created before ddl.sql had the
+-- position columns. Results stored in one bulk insert share created_at, so
+-- readers order by (created_at, position). Older rows keep a NULL position
+-- and are still ordered by their distinct created_at. Safe to run more than once:
+--   psql "$DATABASE_URL" -f migrations/003_search_result_positions.sql
+
+ALTER TABLE search_results ADD COLUMN IF NOT EXISTS position INT;
+ALTER TABLE blog_search_results ADD COLUMN IF NOT EXISTS position INT;
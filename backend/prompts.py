@@ -120,6 +120,25 @@ suggest_prompt = Template("""
     ${query}
 """)
 
+history_digest_prompt = Template("""
+    You maintain a running digest of a research conversation between a user and a web search assistant.
+    Fold the new conversation turns into the existing digest so that follow-up questions can still be understood.
+
+    To write the digest follow these rules:
+    - Keep every topic, entity, name, date and number the user asked about or was told.
+    - Keep the order in which topics came up.
+    - Drop citations, links, formatting and filler.
+    - Use at most ${max_words} words. USE ONLY PLAIN-TEXT.
+
+    GENERATE ONLY THE UPDATED DIGEST AND NOTHING ELSE.
+
+    The existing digest is:
+    ${digest}
+
+    The new conversation turns are:
+    ${turns}
+""")
+
 
 blog_breakdown_prompt = Template("""
 You are a research assistant for a blog writer. Your job is to do preliminary research on a given topic.
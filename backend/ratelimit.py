@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class TokenBucket:
+    """Async token bucket that paces callers to `rate` acquisitions per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds`, e.g. to honour Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: grows by about one slot per window of successes, halves on overload"""
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, backoff: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_overload(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+class AdaptiveRateLimiter:
+    """Token-bucket pacing plus AIMD concurrency for one upstream API, with queueing metrics"""
+
+    def __init__(self, qps: float, burst: float, initial_concurrency: int,
+                 min_concurrency: int, max_concurrency: int, window: int = 1000):
+        self.bucket = TokenBucket(qps, burst)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.throttled = 0
+        self.wait_times = deque(maxlen=window)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a rate token and a concurrency slot, then hold the slot for the call"""
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        started = time.monotonic()
+        try:
+            await self.bucket.acquire()
+            await self.concurrency.acquire()
+        finally:
+            self.queue_depth -= 1
+        self.wait_times.append(time.monotonic() - started)
+        self.requests += 1
+        try:
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def on_success(self):
+        self.concurrency.on_success()
+
+    def on_throttled(self, retry_after: float = None):
+        """Back off after a 429, pausing new requests for retry_after seconds if given"""
+        self.throttled += 1
+        self.concurrency.on_overload()
+        if retry_after:
+            self.bucket.pause(retry_after)
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_times)
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "wait_avg_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_ms": 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "wait_max_ms": 1000 * waits[-1] if waits else 0.0,
+        }
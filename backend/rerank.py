@@ -0,0 +1,107 @@
+import os
+import string
+from collections import Counter
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RERANK_TOP_K = int(os.getenv('RERANK_TOP_K', '10'))
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title words count this many times towards a document's term frequencies
+TITLE_WEIGHT = 2
+
+# Every character str.split() treats as whitespace (none lie above U+3000)
+WHITESPACE = ''.join(char for char in map(chr, range(0x3001)) if char.isspace())
+# Splitting on whitespace after blanking punctuation is several times faster than a regex.
+# Whitespace becomes a plain space too, so a space is the only word separator left.
+PUNCTUATION_TABLE = str.maketrans({char: ' ' for char in string.punctuation + WHITESPACE})
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is',
+    'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where',
+    'which', 'who', 'why', 'with'
+}
+# Marker after each title and each body; it survives tokenizing and can't occur in result text
+REGION_END = '\x00'
+
+
+def words(text: str) -> list[str]:
+    return text.lower().translate(PUNCTUATION_TABLE).split()
+
+
+def tokenize(text: str) -> list[str]:
+    return [word for word in words(text) if word not in STOPWORDS]
+
+
+def term_frequencies(results: list, terms: dict[str, int]) -> tuple[np.ndarray, np.ndarray]:
+    """Query-term frequency matrix (results x terms) and document lengths.
+
+    Covers title, description and extra_snippets, with title words weighted by
+    TITLE_WEIGHT. Every result goes into one normalized string with a marker after
+    each title and each body, viewed as an array of code points. Word starts and
+    lengths come from array operations, and each query term is matched against the
+    word starts one character at a time, so no Python code runs per word. Stopwords
+    stay in the lengths because only query terms are ever looked up.
+    """
+    count, width = len(results), len(terms)
+    text = " ".join(
+        f"{result.get('title') or ''} {REGION_END} {result.get('description') or ''} "
+        f"{' '.join(result.get('extra_snippets') or ())} {REGION_END}"
+        for result in results
+    )
+    # Trailing spaces so a term can be compared past the end of the last word
+    padding = " " * (max(map(len, terms)) + 1)
+    text = f" {text}{padding}".lower().translate(PUNCTUATION_TABLE)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    # Region 2i is result i's title and 2i + 1 its body
+    markers = codes == ord(REGION_END)
+    blank = (codes == ord(' ')) | markers
+    starts = np.flatnonzero(blank[:-1] & ~blank[1:]) + 1
+    region_ends = np.flatnonzero(markers)
+    lengths = np.bincount(np.searchsorted(region_ends, starts), minlength=2 * count).reshape(count, 2)
+
+    tf = np.zeros((2 * count, width))
+    for term, column in terms.items():
+        matches = starts
+        for offset, char in enumerate(term):
+            matches = matches[codes[matches + offset] == ord(char)]
+        matches = matches[blank[matches + len(term)]]
+        tf[:, column] = np.bincount(np.searchsorted(region_ends, matches), minlength=2 * count)
+    tf = tf.reshape(count, 2, width)
+    return TITLE_WEIGHT * tf[:, 0] + tf[:, 1], TITLE_WEIGHT * lengths[:, 0] + lengths[:, 1]
+
+
+def bm25_scores(results: list, queries: list[str]) -> list[float]:
+    """Score each result against the combined query terms with BM25"""
+    query_terms = Counter(word for query in queries if query for word in tokenize(query))
+    if not results or not query_terms:
+        return [0.0] * len(results)
+
+    terms = {term: column for column, term in enumerate(query_terms)}
+    query_weights = np.fromiter(query_terms.values(), dtype=float, count=len(query_terms))
+    tf, lengths = term_frequencies(results, terms)
+
+    count = len(results)
+    frequency = np.count_nonzero(tf, axis=0)
+    # Terms no result contains add nothing, since their tf is zero everywhere
+    idf = np.log1p((count - frequency + 0.5) / (frequency + 0.5))
+    norm = K1 * (1 - B + B * lengths / (lengths.mean() or 1.0))
+    scores = (tf * (K1 + 1) / (tf + norm[:, None])) @ (query_weights * idf)
+    return scores.tolist()
+
+
+def rank_results(results: list, queries: list[str], top_k: int = RERANK_TOP_K) -> tuple[list[int], list[float]]:
+    """Indices of the top_k results by BM25 relevance to the queries, best first, with their scores"""
+    scores = bm25_scores(results, queries)
+    # sorted() is stable, so ties keep their arrival order
+    ranked = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)[:top_k]
+    return ranked, [scores[i] for i in ranked]
+
+
+def rerank_with_scores(results: list, queries: list[str], top_k: int = RERANK_TOP_K) -> tuple[list, list[float]]:
+    """Order results by BM25 relevance to the queries, keep the top_k and return their scores too"""
+    ranked, scores = rank_results(results, queries, top_k)
+    return [results[i] for i in ranked], scores
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget for one request, handed down to every call it makes"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = None) -> float:
+        """Seconds the next call may take, capped at `cap`. Raises once the budget is spent."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return min(remaining, cap) if cap is not None else remaining
+
+
+def deadline_timeout(deadline: Deadline | None, cap: float) -> float:
+    """Per-call timeout for an optional deadline"""
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+async def iterate_with_deadline(iterable, deadline: Deadline | None):
+    """Re-yield an async iterable, giving up once the deadline passes between items"""
+    iterator = aiter(iterable)
+    while True:
+        try:
+            if deadline is None:
+                item = await anext(iterator)
+            else:
+                item = await asyncio.wait_for(anext(iterator), deadline.timeout())
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Request deadline exceeded while streaming")
+        yield item
+
+
+class LatencyTracker:
+    """Rolling latency window used to pick the hedging delay"""
+
+    def __init__(self, default_delay: float, percentile: float = 0.95, window: int = 200, min_samples: int = 20):
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        if len(self.samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(self.samples)
+        return ordered[int(self.percentile * (len(ordered) - 1))]
+
+
+async def hedged(fn, delay: float):
+    """Call fn, and if it hasn't finished after `delay` seconds fire a duplicate.
+
+    Whichever finishes first successfully wins and the other is cancelled.
+    """
+    first = asyncio.ensure_future(fn())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done:
+        return first.result()
+
+    tasks = {first, asyncio.ensure_future(fn())}
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not tasks:
+                # Both failed, surface the last error
+                return done.pop().result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class CircuitBreaker:
+    """Fail fast once a provider keeps failing, then let a single probe through after a cool-off"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self):
+        """Raise CircuitOpenError while open, otherwise record how the wrapped call went"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            yield
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, not failed; free the probe slot for the next caller
+            self.probing = False
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+        }
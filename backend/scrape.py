@@ -1,7 +1,7 @@
 import asyncio
 from typing import Dict, Any, Optional
 from crawl4ai import AsyncWebCrawler, BrowserConfig
-from litellm import completion
+from llm import acompletion
 
 async def scrape_url(url: str, query: str, scraper_model: str = "gemini/gemini-2.0-flash-lite") -> Dict[Any, Any]:
     try:
@@ -35,7 +35,7 @@ async def scrape_url(url: str, query: str, scraper_model: str = "gemini/gemini-2
             {result.markdown}
             """
             # Get summary from LLM
-            response = completion(
+            response = await acompletion(
                 model=scraper_model,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that provides clear, accurate summaries in markdown format."},
@@ -1,60 +1,119 @@
-from litellm import completion
+from llm import acompletion
 import os
-import requests
-import re
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import json
-from prompts import followup_breakdown_prompt, breakdown_prompt, summarize_prompt, suggest_prompt
-import atexit
+import asyncio
+from prompts import (followup_breakdown_prompt, breakdown_prompt, summarize_prompt, suggest_prompt,
+                     history_digest_prompt)
+from brave import brave_get, brave_latency, BRAVE_TIMEOUT
+from search_cache import brave_cache, make_key
+from citations import CitationRewriter
+from dedup import Deduplicator, deduplicate_results
+from rerank import rank_results, rerank_with_scores
+from singleflight import inflight, make_key as flight_key
+from context_packer import pack_context, CONTEXT_TOKEN_BUDGET
+from sse import sse_event, content_hash, coalesce
+from history import compact_history, HISTORY_DIGEST_TOKENS
+from resilience import (Deadline, CircuitBreaker, LatencyTracker, hedged,
+                        deadline_timeout, iterate_with_deadline)
+import time
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
-# Create a shared ThreadPoolExecutor for web searches
-# Using max_workers=5 as that was the original setting
-web_search_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="web_search")
 
-# Ensure proper cleanup on application shutdown
-def cleanup_threadpool():
-    web_search_executor.shutdown(wait=True)
+logger = logging.getLogger(__name__)
 
-atexit.register(cleanup_threadpool)
-
-lite_llm_model = "gemini/gemini-2.0-flash-lite"
-llm_model = "gemini/gemini-2.5-pro-exp-03-25"
+lite_llm_model = os.getenv('LITE_LLM_MODEL', "gemini/gemini-2.0-flash-lite")
+llm_model = os.getenv('LLM_MODEL', "gemini/gemini-2.5-pro-exp-03-25")
+# Point every model at an OpenAI-compatible server instead, e.g. the load-test stub
+llm_api_base = os.getenv('LLM_API_BASE')
 sample_size = 10
 brave_search_size = 5
+# Search the raw query while breakdown() runs on first turns
+speculative_search = os.getenv('SPECULATIVE_SEARCH', 'true').lower() == 'true'
+# Seconds to wait for slow terms once the first term's results are in
+straggler_deadline = float(os.getenv('STRAGGLER_DEADLINE', '2.5'))
+# Start suggestions once this much of the summary has streamed
+suggestions_after_chars = int(os.getenv('SUGGESTIONS_AFTER_CHARS', '1500'))
+
+# Total time budget for one search request, and the cap for any single LLM call
+search_deadline = float(os.getenv('SEARCH_DEADLINE', '120'))
+llm_timeout = float(os.getenv('LLM_TIMEOUT', '60'))
+# Hedge a breakdown call that is still running after this long until enough latencies are recorded
+breakdown_hedge_delay = float(os.getenv('BREAKDOWN_HEDGE_DELAY', '2.0'))
+
+# Strong references to fire-and-forget tasks such as persistence
+background_tasks = set()
+# The save still running for each chat, which that chat's next turn waits for
+pending_saves = {}
 
+gemini_breaker = CircuitBreaker("gemini")
+breakdown_latency = LatencyTracker(default_delay=breakdown_hedge_delay)
 
-def brave_search(query: str, country: str) -> dict:
-    headers = {
-        'Accept': 'application/json',
-        'Accept-Encoding': 'gzip',
-        'X-Subscription-Token': os.getenv('BRAVE_API_KEY_BASE_AI')
-    }
-    response = requests.get(
-        'https://api.search.brave.com/res/v1/web/search',
+
+async def brave_search(query: str, country: str, deadline: Deadline = None) -> dict:
+    cache_key = make_key('web', query, country, brave_search_size)
+    cached = await brave_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Identical concurrent lookups share one request, hedged if it runs past the usual p95
+    timeout = deadline_timeout(deadline, BRAVE_TIMEOUT)
+    response = await inflight.do(cache_key, lambda: hedged(lambda: brave_get(
+        '/res/v1/web/search',
         params={'q': query, 'count': brave_search_size, 'country': country},
-        headers=headers
-    )
-    return response.json()
-
-def brave_image_search(query: str, country: str) -> dict:
-    headers = {
-        'Accept': 'application/json',
-        'Accept-Encoding': 'gzip',
-        'X-Subscription-Token': os.getenv('BRAVE_API_KEY_BASE_AI')
-    }
-    response = requests.get(
-        'https://api.search.brave.com/res/v1/images/search',
+        timeout=timeout
+    ), brave_latency.hedge_delay()))
+    await brave_cache.set(cache_key, response)
+    return response
+
+async def brave_image_search(query: str, country: str, deadline: Deadline = None) -> dict:
+    cache_key = make_key('images', query, country, brave_search_size)
+    cached = await brave_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    timeout = deadline_timeout(deadline, BRAVE_TIMEOUT)
+    response = await inflight.do(cache_key, lambda: hedged(lambda: brave_get(
+        '/res/v1/images/search',
         params={'q': query, 'count': brave_search_size, 'country': country},
-        headers=headers
-    )
-    return response.json()
-    
+        timeout=timeout
+    ), brave_latency.hedge_delay()))
+    await brave_cache.set(cache_key, response)
+    return response
+
+async def lite_completion(key: str, prompt: str, deadline: Deadline = None,
+                          latency: LatencyTracker = None) -> str:
+    """Run a lite-model prompt, sharing the call with identical concurrent requests.
 
+    With a latency tracker the call is hedged once it runs past the tracked p95.
+    """
+    timeout = deadline_timeout(deadline, llm_timeout)
 
-def breakdown(query: str = None, is_follow_up: bool = False, history: str = None):
+    async def call():
+        with gemini_breaker.guard():
+            started = time.monotonic()
+            response = await acompletion(
+                model=lite_llm_model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                api_key=os.getenv('GEMINI_API_KEY'),
+                api_base=llm_api_base,
+                timeout=timeout
+            )
+        if latency is not None:
+            latency.record(time.monotonic() - started)
+        return response.choices[0].message.content
+
+    if latency is None:
+        return await inflight.do(key, call)
+    return await inflight.do(key, lambda: hedged(call, latency.hedge_delay()))
+
+
+async def breakdown(query: str = None, is_follow_up: bool = False, history: str = None,
+                    deadline: Deadline = None):
     if query is None:
         return {"error": "No search query provided"}
 
@@ -72,75 +131,104 @@ def breakdown(query: str = None, is_follow_up: bool = False, history: str = None
             query=query
         )
         
-    response = completion(
-        model=lite_llm_model,
-        messages=[
-            {
-                "role": "user",
-                "content": formatted_prompt
-            }
-        ],
-        api_key=os.getenv('GEMINI_API_KEY')
+    # Keyed on the inputs rather than the prompt, which embeds the current time
+    content = await lite_completion(
+        flight_key('breakdown', lite_llm_model, query, is_follow_up, history),
+        formatted_prompt,
+        deadline=deadline,
+        latency=breakdown_latency
     )
     
     # Extract search terms and add original query
-    search_terms = response.choices[0].message.content.strip().split('\n')
+    search_terms = content.strip().split('\n')
     if not is_follow_up:
         search_terms.insert(0, query)
     
     return search_terms
 
 # Modify web_search to include scraped content
-def brave_single_search(term, country):
+async def brave_single_search(term, country, deadline: Deadline = None):
     try:
-        results = brave_search(term, country)
+        results = await brave_search(term, country, deadline)
         if 'web' in results and 'results' in results['web']:
             return results['web']['results']
         return []
     except Exception as e:
+        logger.warning(f"Brave search failed for term {term!r}: {str(e)}")
         return []
 
-def web_search(terms: list = None, country: str = None):
+async def stream_web_search(terms: list, country: str = None, prefetched: dict = None,
+                            straggler_deadline: float = None, deadline: Deadline = None):
+    """Yield (term, new_results) as each term's search completes.
+
+    Results are deduplicated against everything yielded before. Once the first
+    term searched by this call has landed, terms still running after
+    straggler_deadline seconds are cancelled so the caller can move on with what
+    has arrived. Prefetched searches don't start that clock, since they may have
+    finished before the other terms were even sent. Nothing is waited for past
+    the request deadline.
+    """
+    loop = asyncio.get_running_loop()
+    prefetched = prefetched or {}
+
+    # Terms that were already started speculatively reuse their in-flight task
+    task_to_term = {}
+    launched = set()
+    for term in dict.fromkeys(terms):
+        task = prefetched.get(term)
+        if task is None:
+            task = asyncio.ensure_future(brave_single_search(term, country, deadline))
+            launched.add(task)
+        task_to_term[task] = term
+
+    deduplicator = Deduplicator()
+    pending = set(task_to_term)
+    cutoff = None if deadline is None else loop.time() + deadline.remaining()
+    try:
+        while pending:
+            timeout = None if cutoff is None else max(0.0, cutoff - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Straggler deadline hit, dropping {len(pending)} unfinished searches")
+                break
+            if straggler_deadline is not None and not done.isdisjoint(launched):
+                straggler_cutoff = loop.time() + straggler_deadline
+                if cutoff is None or straggler_cutoff < cutoff:
+                    cutoff = straggler_cutoff
+                straggler_deadline = None
+            for task in done:
+                yield task_to_term[task], deduplicator.filter(task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def web_search(terms: list = None, country: str = None, prefetched: dict = None,
+                     deadline: Deadline = None):
     if terms is None:
         return {"error": "No search terms provided"}
     
     all_results = []
     
-    # Use the shared ThreadPoolExecutor instead of creating a new one
-    future_to_term = {
-        web_search_executor.submit(brave_single_search, term, country): term 
-        for term in terms
-    }
-    
-    # Collect results as they complete
-    for future in as_completed(future_to_term):
-        results = future.result()
+    # All terms share the pooled Brave client, so run them concurrently on the loop
+    async for _, results in stream_web_search(terms, country, prefetched=prefetched, deadline=deadline):
         all_results.extend(results)
     
     return all_results, []
 
-def convert_search_to_text(results: list = None, detailed_content: str = None):
+def convert_search_to_text(results: list = None, detailed_content: str = None, query: str = None,
+                           token_budget: int = CONTEXT_TOKEN_BUDGET, scores: list = None):
     if results is None:
         return {"error": "No search results provided"}
     
-    formatted_text = "Search Results Overview:\n\n"
-    
-    # First, add the search result summaries
-    for idx, result in enumerate(results, 1):
-        formatted_text += f"[{idx}] Title: {result.get('title', 'No title')}\n"
-        formatted_text += f"Citation Link: {result.get('url', 'No link')}\n"
-        formatted_text += f"Published: {result.get('page_age', 'Date not available')}\n"
-        formatted_text += f"Description: {result.get('description', 'No description')}\n"
-        
-        # Add extra snippets if available
-        if result.get('extra_snippets'):
-            formatted_text += "Extra Information:\n"
-            for snippet in result['extra_snippets']:
-                formatted_text += f"- {snippet}\n"
-        formatted_text += "\n"    
-    return formatted_text.strip()
-
-async def summarize_search_results(query: str = None, context: str = None, chat_history: list = None):
+    formatted_text, report = pack_context(results, query, token_budget, scores=scores)
+    logger.info(
+        f"Packed {report['results_included']}/{report['results_total']} results into "
+        f"{report['packed_tokens']} tokens, saved {report['saved_tokens']} tokens"
+    )
+    return formatted_text
+
+async def summarize_search_results(query: str = None, context: str = None, chat_history: list = None,
+                                   deadline: Deadline = None):
     if query is None or context is None:
         yield ""
         return
@@ -161,20 +249,24 @@ async def summarize_search_results(query: str = None, context: str = None, chat_
         "content": formatted_prompt
     })
     
-    response = completion(
-        model=llm_model,
-        messages=messages,
-        max_tokens=50049,
-        temperature=0.6,
-        stream=True,
-        api_key=os.getenv('GEMINI_API_KEY'),
-    )
-    
-    for part in response:
-        part = part.choices[0].delta.content or ""
-        yield part
+    with gemini_breaker.guard():
+        response = await acompletion(
+            model=llm_model,
+            messages=messages,
+            max_tokens=50049,
+            temperature=0.6,
+            stream=True,
+            api_key=os.getenv('GEMINI_API_KEY'),
+            api_base=llm_api_base,
+            timeout=deadline_timeout(deadline, llm_timeout),
+        )
+        
+        # The deadline also bounds the gaps between streamed chunks
+        async for part in iterate_with_deadline(response, deadline):
+            part = part.choices[0].delta.content or ""
+            yield part
 
-def suggestions(query: str = None, context: str = None):
+async def suggestions(query: str = None, context: str = None, deadline: Deadline = None):
     if query is None or context is None:
         return {"error": "Query and context are required"}
     formatted_prompt = suggest_prompt.substitute(
@@ -182,179 +274,212 @@ def suggestions(query: str = None, context: str = None):
         query=query,
         current_date=datetime.now().isoformat()
     )
-    response = completion(
-        model=lite_llm_model,
-        messages=[
-            {
-                "role": "user",
-                "content": formatted_prompt
-            }
-        ],
-        api_key=os.getenv('GEMINI_API_KEY')
+    content = await lite_completion(
+        flight_key('suggestions', lite_llm_model, query, context),
+        formatted_prompt,
+        deadline=deadline
     )
-    suggestions = response.choices[0].message.content.strip().split('\n')
+    suggestions = content.strip().split('\n')
     return suggestions
 
-def deduplicate_results(results: list) -> list:
-    """Remove duplicate search results based on URL"""
-    seen_urls = set()
-    unique_results = []
-    
-    for result in results:
-        url = result.get('url')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            unique_results.append(result)
-    
-    return unique_results
+async def fold_history(digest: str, turns: list, deadline: Deadline = None) -> str:
+    """Fold older chat turns into the running conversation digest with the lite model"""
+    formatted_prompt = history_digest_prompt.substitute(
+        digest=digest or "No digest yet.",
+        turns="\n\n".join(f"user: {turn['user_query']}\nassistant: {turn['summary']}" for turn in turns),
+        max_words=int(HISTORY_DIGEST_TOKENS * 0.75)
+    )
+    content = await lite_completion(
+        flight_key('history_digest', lite_llm_model, digest, [turn['message_id'] for turn in turns]),
+        formatted_prompt,
+        deadline=deadline
+    )
+    return content.strip()
 
 def fix_citations(text: str, search_results: list) -> str:
     if not isinstance(text, str) or not isinstance(search_results, list):
         raise ValueError("Invalid input: text must be string and search_results must be list")
     
-    # Pattern for plain citations [number] and [number, number]
-    plain_citation_pattern = re.compile(r'\[(\d+(?:,\s*\d+)*)\](?!\()')
-    # Pattern for already formatted citations [number](link)
-    formatted_citation_pattern = re.compile(r'\[\d+\]\([^)]+\)')
-    
-    matches = plain_citation_pattern.findall(text)
-    
-    # Process each unique plain citation
-    for match in set(matches):
-        start_pos = 0
-        while (start_pos := text.find(f"[{match}]", start_pos)) != -1:
-            # Check if this occurrence is part of an already formatted citation
-            substring = text[start_pos:]
-            if not formatted_citation_pattern.match(substring):
-                try:
-                    citation_numbers = [int(num.strip()) for num in match.split(',')]
-                    citation_texts = []
-                    for citation_number in citation_numbers:
-                        if 1 <= citation_number <= len(search_results):
-                            result = search_results[citation_number - 1]
-                            link = result.get('url', '')
-                            if link.strip():
-                                formatted_citation = f'[{citation_number}]({link})'
-                                citation_texts.append(formatted_citation)
-                            else:
-                                citation_texts.append(f"")
-                        else:
-                            citation_texts.append(f"[{citation_number}]")
-                    citation_text = ', '.join(citation_texts)
-                    # Replace only this specific instance
-                    text = text[:start_pos] + citation_text + text[start_pos + len(f"[{match}]"):]
-                    start_pos += len(citation_text)
-                except (ValueError, IndexError):
-                    text = text[:start_pos] + "" + text[start_pos + len(f"[{match}]"):]
-                    start_pos += 1
-            else:
-                # Skip this occurrence since it's already formatted
-                start_pos += len(f"[{match}]")
-    
-    return text
+    rewriter = CitationRewriter(search_results)
+    return rewriter.feed(text) + rewriter.flush()
+
+def run_in_background(coro) -> asyncio.Task:
+    """Run a coroutine as a fire-and-forget task, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def save_in_background(chat_id: str, coro) -> asyncio.Task:
+    """Run a chat's save in the background, recorded so its next turn can wait for it"""
+    task = run_in_background(coro)
+    pending_saves[chat_id] = task
+
+    def forget(done):
+        if pending_saves.get(chat_id) is done:
+            del pending_saves[chat_id]
+
+    task.add_done_callback(forget)
+    return task
+
+async def persist_search_turn(db, chat_id: str, user_id: str, query: str, summary: str, search_results: list):
+    """Save a finished turn and clear the pending query"""
+    try:
+        if user_id:
+            # Save user query and AI response together
+            message = await db.create_chat_message(
+                chat_id=chat_id,
+                user_id=user_id,
+                user_query=query,
+                ai_response=summary
+            )
+            
+            # Store search results
+            await db.store_search_results(chat_id, message['message_id'], search_results)
+        
+        # Clear the pending query this turn answered, unless a follow-up replaced it
+        await db.delete_pending_chat(chat_id, query)
+    except Exception as e:
+        logger.error(f"Error saving search turn for chat_id {chat_id}: {str(e)}")
 
 async def stream_search_with_history(chat_id: str = None, user_id: str = None, db = None, country: str = "US"):
     if chat_id is None:
-        yield f"event: error\ndata: {json.dumps({'error': 'No chat ID provided'})}\n\n"
+        yield sse_event('error', {'error': 'No chat ID provided'})
         return
     
+    suggestions_task = None
+    deadline = Deadline(search_deadline)
     try:
-        # Fetch chat details from database
-        chat_details = db.get_chat_details(chat_id)
-        yield f"event: chatHistory\ndata: {json.dumps(chat_details)}\n\n"
+        # Let the previous turn's save land first so it shows up in the history
+        # and its pending query is already cleared
+        if (save := pending_saves.get(chat_id)) is not None:
+            await asyncio.shield(save)
+
+        # Only queries and summaries are needed here; the UI loads each message's
+        # search results on demand from /message-search-results
+        chat_turns = await db.get_chat_turns(chat_id)
         
-        # Check for pending queries
-        pending_query = db.get_pending_chat(chat_id)
+        # Check for pending queries, then send the history once along with it
+        pending_query = await db.get_pending_chat(chat_id)
         pending_info = {
-            "chatHistory": chat_details,
+            "chatHistory": chat_turns,
             "pending_query": bool(pending_query)
         }
-        yield f"event: chatHistory\ndata: {json.dumps(pending_info)}\n\n"
+        yield sse_event('chatHistory', pending_info)
         if not pending_query:
             complete_data = {
                 "status": "NO_PENDING"
             }
-            yield f"event: complete\ndata: {json.dumps(complete_data)}\n\n"
+            yield sse_event('complete', complete_data)
             return
         
         query = pending_query['query']
         country = pending_query.get('country', 'US')
         
-        is_follow_up = bool(chat_details)
-
-        chat_history = []
-        for msg in chat_details:
-            chat_history.append({
-                "role": "user",
-                "content": msg['user_query']
-            })
-            chat_history.append({
-                "role": "assistant",
-                "content": msg['summary']
-            })
+        is_follow_up = bool(chat_turns)
+
+        # Older turns are folded into a stored digest so the prompts stay under budget
+        chat_history = await compact_history(
+            db, chat_id, chat_turns,
+            lambda digest, turns: fold_history(digest, turns, deadline=deadline)
+        )
         
         # Step 1: Get search terms
         history = "No History, just use the query."
         if is_follow_up:
             history = "\n".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
 
-        terms = breakdown(query, is_follow_up=is_follow_up, 
-                        history=history)
-        yield f"event: breakdown\ndata: {json.dumps(terms)}\n\n"
+        # breakdown() always puts the raw query first on a first turn, so start
+        # searching it now instead of waiting for the LLM round trip
+        prefetched = {}
+        if speculative_search and not is_follow_up:
+            prefetched[query] = asyncio.create_task(brave_single_search(query, country, deadline))
+
+        try:
+            terms = await breakdown(query, is_follow_up=is_follow_up, 
+                            history=history, deadline=deadline)
+        except Exception as e:
+            # A slow or failing lite model shouldn't sink the search, fall back to the raw query
+            logger.warning(f"Breakdown failed for chat_id {chat_id}, searching the query only: {str(e)}")
+            terms = [query]
+        yield sse_event('breakdown', terms)
         
-        # Step 2: Perform web search and get results
-        search_results, detailed_content = web_search(terms, country)
-        search_results = deduplicate_results(search_results)
-        yield f"event: search_results\ndata: {json.dumps(search_results)}\n\n"
+        # Step 2: Perform web search, streaming each term's new results as they land
+        search_results = []
+        detailed_content = []
+        async for term, term_results in stream_web_search(terms, country, prefetched=prefetched,
+                                                          straggler_deadline=straggler_deadline,
+                                                          deadline=deadline):
+            search_results.extend(term_results)
+            yield sse_event('search_results_partial', {'term': term, 'results': term_results})
+        # Scored once; the context packer reuses these scores instead of running BM25 again.
+        # terms already starts with the query on a first turn (or when breakdown fell back
+        # to it), so it's only added when a follow-up was rewritten into other terms.
+        queries = terms if terms[0] == query else [query] + terms
+        order, scores = rank_results(search_results, queries)
+        search_results = [search_results[i] for i in order]
+        # Clients already hold every result from search_results_partial, in arrival order,
+        # so only the reranked selection goes out: indices into that list, best first
+        yield sse_event('search_results', {'order': order})
         
         # Step 3: Convert to text and prepare for analysis
-        context = convert_search_to_text(search_results, detailed_content)
+        context = convert_search_to_text(search_results, detailed_content, query=query, scores=scores)
         
-        # Stream summary parts as they arrive
-        accumulated_summary = ""
-        async for part in summarize_search_results(query, context, chat_history):
-            fixed_part = fix_citations(part, search_results)
-            accumulated_summary += fixed_part
-            yield f"event: summary_part\ndata: {json.dumps(fixed_part)}\n\n"
+        # Stream summary parts as they arrive, linking citations in a single pass.
+        # Suggestions start from the early summary so they overlap the rest of the stream.
+        suggestions_query = terms[0] if is_follow_up else query
+        citation_rewriter = CitationRewriter(search_results)
+        summary_parts = []
+        summary_chars = 0
+        # Deltas are batched into fewer frames, so the rewriter also runs once per frame
+        async for part in coalesce(summarize_search_results(query, context, chat_history, deadline=deadline)):
+            fixed_part = citation_rewriter.feed(part)
+            if fixed_part:
+                summary_parts.append(fixed_part)
+                summary_chars += len(fixed_part)
+                yield sse_event('summary_part', fixed_part)
+            if suggestions_task is None and summary_chars >= suggestions_after_chars:
+                suggestions_task = asyncio.create_task(
+                    suggestions(suggestions_query, "".join(summary_parts), deadline=deadline)
+                )
+        fixed_part = citation_rewriter.flush()
+        if fixed_part:
+            summary_parts.append(fixed_part)
+            yield sse_event('summary_part', fixed_part)
+        accumulated_summary = "".join(summary_parts)
         
-        # Save to database if chat_id is provided
-
-        accumulated_summary = fix_citations(accumulated_summary, search_results)
-
-        if chat_id and user_id:
-            # Save user query and AI response together
-            message = db.create_chat_message(
-                chat_id=chat_id,
-                user_id=user_id,
-                user_query=query,
-                ai_response=accumulated_summary
+        if suggestions_task is None:
+            suggestions_task = asyncio.create_task(
+                suggestions(suggestions_query, accumulated_summary, deadline=deadline)
             )
-            
-            # Store search results
-            db.store_search_results(chat_id, message['message_id'], search_results)
-        
-        # Get suggestions and complete the response
-        suggestions_result = ""
-        if is_follow_up:
-            suggestions_result = suggestions(terms[0], accumulated_summary)
-        else:
-            suggestions_result = suggestions(query, accumulated_summary)
         
-        # Delete pending search for the chat_id
+        # Saved in the background so complete doesn't wait on the database; the
+        # chat's next turn waits for this save before reading its history
         if chat_id:
-            db.delete_pending_chat(chat_id)
+            save_in_background(chat_id, persist_search_turn(
+                db, chat_id, user_id, query, accumulated_summary, search_results
+            ))
         
+        # Results and summary were already streamed; the hash lets the client check its copy
         complete_data = {
             "query": query,
-            "search_results": search_results,
-            "summary": accumulated_summary,
-            "suggestions": suggestions_result,
+            "summary_hash": content_hash(accumulated_summary),
             "status": "SEARCH_DONE"
         }
-        yield f"event: complete\ndata: {json.dumps(complete_data)}\n\n"
+        yield sse_event('complete', complete_data)
+        
+        try:
+            suggestions_result = await suggestions_task
+        except Exception as e:
+            logger.error(f"Error generating suggestions for chat_id {chat_id}: {str(e)}")
+            suggestions_result = []
+        yield sse_event('suggestions', suggestions_result)
         
     except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        yield sse_event('error', {'error': str(e)})
+    finally:
+        if suggestions_task is not None and not suggestions_task.done():
+            suggestions_task.cancel()
 
 async def test_search():
     # Mock chat history as message objects
@@ -373,15 +498,15 @@ async def test_search():
     country = "US"
     
     # Get search terms and perform search
-    terms = breakdown(test_query, is_follow_up=True, 
+    terms = await breakdown(test_query, is_follow_up=True, 
                      history="\n".join([f"{msg['role']}: {msg['content']}" for msg in mock_history]))
     
     # Perform web search
-    search_results, detailed_content = web_search(terms, country)
+    search_results, detailed_content = await web_search(terms, country)
     search_results = deduplicate_results(search_results)
     
     # Convert to text format
-    context = convert_search_to_text(search_results, detailed_content)
+    context = convert_search_to_text(search_results, detailed_content, query=test_query)
     
     # Test summarize_search_results with chat history
     summary = ""
@@ -389,24 +514,25 @@ async def test_search():
         summary += part
 
 async def search_sync(query: str, country: str = "US", chat_history: list = None):
+    deadline = Deadline(search_deadline)
     try:
         # Perform web search and get results
        # breakdown_terms = breakdown(query, is_follow_up=False, history=None)
-        search_results, detailed_content = web_search([query], country)
-        search_results = deduplicate_results(search_results)
+        search_results, detailed_content = await web_search([query], country, deadline=deadline)
+        search_results, scores = rerank_with_scores(search_results, [query])
         
         # Convert to text and prepare for analysis
-        context = convert_search_to_text(search_results, detailed_content)
+        context = convert_search_to_text(search_results, detailed_content, query=query, scores=scores)
         
         summary = ""
-        async for part in summarize_search_results(query, context, chat_history):
+        async for part in summarize_search_results(query, context, chat_history, deadline=deadline):
             summary += part
             
         # Fix citations in the summary
         summary = fix_citations(summary, search_results)
         
         # Get suggestions
-        suggestions_result = suggestions(query, summary)
+        suggestions_result = await suggestions(query, summary, deadline=deadline)
         
         return {
             "query": query,
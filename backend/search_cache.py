@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BRAVE_CACHE_TTL = float(os.getenv('BRAVE_CACHE_TTL', '3600'))
+BRAVE_CACHE_MAX_ENTRIES = int(os.getenv('BRAVE_CACHE_MAX_ENTRIES', '1024'))
+BRAVE_CACHE_PATH = os.getenv('BRAVE_CACHE_PATH')  # unset disables the on-disk tier
+BRAVE_CACHE_DISK_MAX_ENTRIES = int(os.getenv('BRAVE_CACHE_DISK_MAX_ENTRIES', '50000'))
+
+
+def make_key(kind: str, term: str, country: str, count: int) -> str:
+    """Build a cache key from a normalized (term, country, count)"""
+    normalized_term = " ".join(term.lower().split())
+    return f"{kind}|{country or ''}|{count}|{normalized_term}"
+
+
+class DiskStore:
+    """SQLite-backed second tier. Methods are blocking and meant to run in a thread."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_stored_at ON search_cache(stored_at)")
+        self.conn.commit()
+
+    def get(self, key: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            value, expires_at = row
+            if expires_at <= time.time():
+                self.conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return None, None
+            return json.loads(value), expires_at
+
+    def set(self, key: str, value, expires_at: float) -> int:
+        """Store an entry and return how many entries were evicted to stay bounded"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO search_cache (key, value, expires_at, stored_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE
+                SET value = excluded.value, expires_at = excluded.expires_at, stored_at = excluded.stored_at
+            """, (key, json.dumps(value), expires_at, now))
+            evicted = self.conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,)).rowcount
+            overflow = self.conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                evicted += self.conn.execute("""
+                    DELETE FROM search_cache WHERE key IN (
+                        SELECT key FROM search_cache ORDER BY stored_at ASC LIMIT ?
+                    )
+                """, (overflow,)).rowcount
+            self.conn.commit()
+            return evicted
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class SearchCache:
+    """Two-tier TTL cache: an in-process LRU in front of an optional SQLite store.
+
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, disk_path: str = None, disk_max_entries: int = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.disk = DiskStore(disk_path, disk_max_entries) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+
+        if self.disk is not None:
+            value, expires_at = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value, expires_at)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value):
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self.disk is not None:
+            self.evictions += await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    def _remember(self, key: str, value, expires_at: float):
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+# Shared cache for every Brave lookup in the process
+brave_cache = SearchCache(
+    ttl=BRAVE_CACHE_TTL,
+    max_entries=BRAVE_CACHE_MAX_ENTRIES,
+    disk_path=BRAVE_CACHE_PATH,
+    disk_max_entries=BRAVE_CACHE_DISK_MAX_ENTRIES,
+)
@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import json
+
+
+def make_key(endpoint: str, *params) -> str:
+    """Stable key for an endpoint and its normalized parameters"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return f"{endpoint}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls so only one of them does the work.
+
+    Callers that arrive while a call with the same key is in flight await the
+    same task instead of starting their own. Nothing is kept once the call
+    finishes, so this is not a cache. Results are shared and must not be mutated.
+    """
+
+    def __init__(self):
+        self.in_flight: dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn):
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield the shared task so one caller giving up doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.in_flight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
+
+
+# Shared across Brave and LLM calls; keys are namespaced by endpoint
+inflight = SingleFlight()
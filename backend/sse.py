@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import os
+import time
+import orjson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Streamed text is batched into one frame per interval or once this many bytes are
+# waiting, whichever comes first. An interval of 0 sends every delta as it arrives.
+SSE_COALESCE_MS = float(os.getenv('SSE_COALESCE_MS', '50'))
+SSE_COALESCE_BYTES = int(os.getenv('SSE_COALESCE_BYTES', '2048'))
+
+
+def dumps(value) -> str:
+    """Serialize to compact JSON with orjson; datetimes and UUIDs are handled natively"""
+    return orjson.dumps(value).decode()
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of streamed text, sent on completion so clients can check what they assembled"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def coalesce(parts, interval_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES):
+    """Re-yield streamed text in batches instead of one tiny delta at a time.
+
+    The first delta goes out immediately so time to first token is unchanged.
+    After that, text is held until interval_ms has passed since the last flush
+    or max_bytes are waiting, and whatever is left is flushed when the stream ends.
+    The timer runs even while the source is quiet, so a stalled model never
+    holds back text that has already arrived.
+    """
+    interval = interval_ms / 1000
+    iterator = aiter(parts)
+    buffer = []
+    size = 0
+    last_flush = float('-inf')
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                # Awaited through a task so a flush timeout never cancels the source mid-read
+                pending = asyncio.ensure_future(anext(iterator))
+            timeout = max(0.0, last_flush + interval - time.monotonic()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                task, pending = pending, None
+                try:
+                    part = task.result()
+                except StopAsyncIteration:
+                    break
+                if part:
+                    buffer.append(part)
+                    size += len(part.encode())
+            if buffer and (size >= max_bytes or time.monotonic() - last_flush >= interval):
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+                last_flush = time.monotonic()
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
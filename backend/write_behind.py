@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Longest a blog's generation state may lag behind its stream within one stage
+BLOG_STATE_FLUSH_MS = float(os.getenv('BLOG_STATE_FLUSH_MS', '1000'))
+
+
+class GenerationStateBuffer:
+    """Write-behind buffer for one blog's row in blog_generation_state.
+
+    update() only remembers the latest state. It is written straight away when
+    the stage changes or the run completes, and otherwise flush_ms after the
+    first unwritten update, so a burst of progress events within a stage costs
+    one UPSERT instead of one per event. Intermediate states are dropped, which
+    is fine because the row only ever holds the latest one. Call flush() when
+    the run ends, however it ends, to write whatever is still buffered.
+    """
+
+    def __init__(self, db, blog_id: str, flush_ms: float = BLOG_STATE_FLUSH_MS):
+        self.db = db
+        self.blog_id = blog_id
+        self.interval = flush_ms / 1000
+        self.pending = None
+        self.written_stage = None
+        self.timer = None
+        self.lock = asyncio.Lock()
+        self.updates = 0
+        self.writes = 0
+
+    async def update(self, stage: str, iteration: int = 0, is_completed: bool = False,
+                     event_type: str = None, event_data: dict = None):
+        """Same arguments as AsyncDatabase.update_generation_state, minus the blog_id"""
+        self.updates += 1
+        self.pending = (stage, iteration, is_completed, event_type, event_data)
+        if is_completed or stage != self.written_stage:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.interval)
+        # Cleared before writing so flush() never cancels a write in progress
+        self.timer = None
+        try:
+            await self.write()
+        except Exception as e:
+            logger.warning(f"Failed to write generation state for blog_id {self.blog_id}: {str(e)}")
+
+    async def flush(self):
+        """Write the buffered state now, if there is one"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        await self.write()
+
+    async def write(self):
+        async with self.lock:
+            if self.pending is None:
+                return
+            state, self.pending = self.pending, None
+            try:
+                await self.db.update_generation_state(self.blog_id, *state)
+            except Exception:
+                # Keep it for the next flush unless a newer state arrived meanwhile
+                if self.pending is None:
+                    self.pending = state
+                raise
+            self.written_stage = state[0]
+            self.writes += 1
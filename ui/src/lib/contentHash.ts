@@ -0,0 +1,16 @@
+// SHA-256 of streamed text, matching sse.content_hash on the backend
+export async function contentHash(text: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest))
+    .map(byte => byte.toString(16).padStart(2, '0'))
+    .join('');
+}
+
+// Streams are assembled from their parts, so flag any drift against the server's copy
+export function warnOnHashMismatch(text: string, expected: string) {
+  contentHash(text).then(actual => {
+    if (actual !== expected) {
+      console.warn('Streamed content does not match the server copy', { expected, actual });
+    }
+  });
+}
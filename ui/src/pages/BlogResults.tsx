@@ -10,6 +10,7 @@ import rehypePrism from 'rehype-prism-plus';
 import { EventSourcePolyfill } from "event-source-polyfill";
 import { useState, useEffect, useRef } from 'react';
 import { cn } from "@/lib/utils";
+import { warnOnHashMismatch } from "@/lib/contentHash";
 import { Button } from "@/components/ui/button";
 import ThinkingBox from "@/components/ThinkingBox";
 // Import for components prop type
@@ -1499,8 +1500,12 @@ function BlogResults() {
           }));
         });
 
+        // A freshly generated blog's complete event only carries a hash of the streamed parts
+        const streamedParts: string[] = [];
+
         eventSource.addEventListener('blog_part', (e: MessageEvent) => {
           const blogPart = JSON.parse(e.data);
+          streamedParts.push(blogPart.content);
           setBlogState(prev => ({
             ...prev,
             blogContent: [...prev.blogContent, blogPart.content]
@@ -1509,7 +1514,10 @@ function BlogResults() {
 
         eventSource.addEventListener('complete', (e: MessageEvent) => {
           const completeData = JSON.parse(e.data);
-          console.log(completeData);
+          if (completeData.blog_content === undefined) {
+            completeData.blog_content = streamedParts.join('');
+            warnOnHashMismatch(completeData.blog_content, completeData.content_hash);
+          }
           setBlogState(prev => ({
             ...prev,
             isComplete: true,
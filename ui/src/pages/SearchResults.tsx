@@ -1,4 +1,4 @@
-import { useQuery } from '@tanstack/react-query'
+import { useQuery, useQueryClient } from '@tanstack/react-query'
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { SearchIcon, Loader2, ChevronRightIcon, ChevronLeftIcon } from "lucide-react";
@@ -13,6 +13,7 @@ import rehypeSanitize from 'rehype-sanitize';
 import { EventSourcePolyfill } from "event-source-polyfill";
 import { useState, useEffect, useRef } from 'react';
 import { cn } from "@/lib/utils";
+import { warnOnHashMismatch } from "@/lib/contentHash";
 import { Skeleton } from "@/components/ui/skeleton";
 import rehypePrism from 'rehype-prism-plus';
 
@@ -109,6 +110,7 @@ function SearchResults() {
   const query = searchParams.get('q');
   const chatId = searchParams.get('chat_id');
   const inputRef = useRef<HTMLInputElement>(null);
+  const queryClient = useQueryClient();
 
   // Streaming state
   const [streamStatus, setStreamStatus] = useState<{
@@ -198,23 +200,39 @@ function SearchResults() {
           setStreamStatus(prev => ({ ...prev, queries }));
         });
 
+        // Every result arrives once in a partial event; the final event only reorders them
+        const arrivedResults: SearchResponse['search_results'] = [];
+
+        eventSource.addEventListener('search_results_partial', (e: MessageEvent) => {
+          const partial = JSON.parse(e.data);
+          arrivedResults.push(...partial.results);
+          setStreamStatus(prev => ({ ...prev, resultsCount: (prev.resultsCount || 0) + partial.results.length }));
+          setStreamedSearchResults(prev => [...prev, ...partial.results]);
+        });
+
         eventSource.addEventListener('search_results', (e: MessageEvent) => {
-          const results = JSON.parse(e.data);
+          const { order } = JSON.parse(e.data) as { order: number[] };
+          const results = order.map(index => arrivedResults[index]);
           currentData.search_results = results;
           setStreamStatus(prev => ({ ...prev, resultsCount: results.length }));
           setStreamedSearchResults(results);
         });
 
+        // The complete event only carries a hash, so the summary is assembled from its parts
+        let summaryText = '';
+
         eventSource.addEventListener('summary_part', (e: MessageEvent) => {
           const part = JSON.parse(e.data);
+          summaryText += part;
           setStreamingSummary(prev => prev + part);
         });
 
         eventSource.addEventListener('complete', (e: MessageEvent) => {
           const data = JSON.parse(e.data);
-          currentData.summary = data.summary;
-          currentData.suggestions = data.suggestions;
-          eventSource.close();
+          currentData.summary = summaryText;
+          if (data.summary_hash) {
+            warnOnHashMismatch(summaryText, data.summary_hash);
+          }
 
           if (data.status === 'SEARCH_DONE') {
             setStreamStatus(prev => {
@@ -238,11 +256,22 @@ function SearchResults() {
             setCurrentChatIndex(prev => {
               return streamStatus.chatHistory ? streamStatus.chatHistory.length : 0;
             });
+
+            // The search is done; suggestions are patched in when their own event arrives
+            resolve({ ...currentData } as SearchResponse);
+            return;
           }
 
+          eventSource.close();
           resolve(currentData as SearchResponse);
         });
 
+        eventSource.addEventListener('suggestions', (e: MessageEvent) => {
+          const suggestions = JSON.parse(e.data);
+          eventSource.close();
+          queryClient.setQueryData<SearchResponse>(queryKey, prev => prev && { ...prev, suggestions });
+        });
+
         eventSource.addEventListener('error', (e: MessageEvent) => {
           eventSource.close();
           setStreamStatus(prev => ({ ...prev, pendingQuery: false }));
@@ -306,6 +335,28 @@ function SearchResults() {
   };
 
   const currentChat = streamStatus.chatHistory?.[currentChatIndex];
+
+  // History arrives without each turn's sources, so fetch them when a turn is first shown
+  useEffect(() => {
+    const messageId = currentChat?.message_id;
+    if (!messageId || currentChat.search_results) return;
+    let cancelled = false;
+    fetch(`http://localhost:8000/message-search-results/${messageId}`)
+      .then(response => response.json())
+      .then(data => {
+        if (cancelled) return;
+        setStreamStatus(prev => ({
+          ...prev,
+          chatHistory: prev.chatHistory?.map(chat =>
+            chat.message_id === messageId ? { ...chat, search_results: data.search_results || [] } : chat
+          )
+        }));
+      })
+      .catch(error => console.error('Failed to load search results:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [currentChat?.message_id, currentChat?.search_results]);
   const isStreaming = streamStatus.pendingQuery || isSearchLoading;
 
   const displaySearchResults = isStreaming